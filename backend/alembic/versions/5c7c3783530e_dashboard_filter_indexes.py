@@ -0,0 +1,45 @@
+"""dashboard filter indexes
+
+Composite indexes for date-range and category/source filtered dashboard
+queries. Tables themselves are created by the app (Base.metadata.create_all),
+so the indexes are created IF NOT EXISTS and CONCURRENTLY to avoid locking
+lead_metrics on large databases.
+
+Revision ID: 5c7c3783530e
+Revises: 
+Create Date: 2026-10-18 15:27:45.550894
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7c3783530e'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ("ix_weeks_start_date_end_date", "weeks", ["start_date", "end_date"]),
+    ("ix_lead_metrics_week_category_source", "lead_metrics", ["week_id", "category_id", "source_id"]),
+    ("ix_lead_metrics_source_week", "lead_metrics", ["source_id", "week_id"]),
+    ("ix_lead_metrics_category_week", "lead_metrics", ["category_id", "week_id"]),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,52 @@
+"""dashboard materialized views
+
+Materialized views mirroring the lead rollup tables, read when
+DASHBOARD_AGGREGATE_SOURCE=matview. Each view gets a unique index so it can be
+refreshed CONCURRENTLY without blocking readers (see app/services/matviews.py).
+
+Revision ID: a81f2c94d0b7
+Revises: 5c7c3783530e
+Create Date: 2026-10-18 19:02:11.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81f2c94d0b7'
+down_revision: Union[str, None] = '5c7c3783530e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MATVIEWS = (
+    ("mv_lead_week_category", ["week_id", "category_id"]),
+    ("mv_lead_week_source", ["week_id", "source_id"]),
+    ("mv_lead_category", ["category_id"]),
+    ("mv_lead_source", ["source_id"]),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, keys in MATVIEWS:
+        columns = ", ".join(keys)
+        op.execute(
+            f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS "
+            f"SELECT {columns}, "
+            f"sum(amount)::bigint AS amount, "
+            f"sum(leads_count)::bigint AS leads_count, "
+            f"count(*) AS metrics_count "
+            f"FROM lead_metrics GROUP BY {columns} "
+            f"WITH DATA"
+        )
+        op.create_index(f"ux_{name}", name, keys, unique=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _ in reversed(MATVIEWS):
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
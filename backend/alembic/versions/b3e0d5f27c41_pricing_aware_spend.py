@@ -0,0 +1,94 @@
+"""pricing-aware spend
+
+Adds `spend` to the lead rollup tables: amount for TOTAL_DIVIDED sources and
+amount * leads_count for FIXED_PER_LEAD ones (see app/services/pricing.py),
+backfills it from lead_metrics and recreates the dashboard materialized views
+with the same column.
+
+Revision ID: b3e0d5f27c41
+Revises: a81f2c94d0b7
+Create Date: 2026-10-18 20:11:37.918402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e0d5f27c41'
+down_revision: Union[str, None] = 'a81f2c94d0b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROLLUPS = (
+    ("lead_rollup_week_category", ["week_id", "category_id"]),
+    ("lead_rollup_week_source", ["week_id", "source_id"]),
+    ("lead_rollup_category", ["category_id"]),
+    ("lead_rollup_source", ["source_id"]),
+)
+
+MATVIEWS = (
+    ("mv_lead_week_category", ["week_id", "category_id"]),
+    ("mv_lead_week_source", ["week_id", "source_id"]),
+    ("mv_lead_category", ["category_id"]),
+    ("mv_lead_source", ["source_id"]),
+)
+
+# Pricing types are stored by enum name
+SPEND = (
+    "CASE WHEN s.pricing_type = 'FIXED_PER_LEAD' "
+    "THEN m.amount::bigint * m.leads_count ELSE m.amount::bigint END"
+)
+
+
+def _create_matviews(spend: bool) -> None:
+    for name, keys in MATVIEWS:
+        columns = ", ".join(f"m.{key}" for key in keys)
+        spend_column = f"sum({SPEND})::bigint AS spend, " if spend else ""
+        join = "JOIN sources s ON s.id = m.source_id " if spend else ""
+        op.execute(
+            f"CREATE MATERIALIZED VIEW {name} AS "
+            f"SELECT {columns}, "
+            f"sum(m.amount)::bigint AS amount, "
+            f"sum(m.leads_count)::bigint AS leads_count, "
+            f"{spend_column}"
+            f"count(*) AS metrics_count "
+            f"FROM lead_metrics m {join}GROUP BY {columns} "
+            f"WITH DATA"
+        )
+        op.create_index(f"ux_{name}", name, keys, unique=True)
+
+
+def _drop_matviews() -> None:
+    for name, _ in reversed(MATVIEWS):
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, keys in ROLLUPS:
+        # Databases created after this change already have the column from create_all
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS spend BIGINT NOT NULL DEFAULT 0")
+        columns = ", ".join(f"m.{key}" for key in keys)
+        matches = " AND ".join(f"r.{key} = totals.{key}" for key in keys)
+        op.execute(
+            f"UPDATE {table} r SET spend = totals.spend "
+            f"FROM (SELECT {columns}, sum({SPEND}) AS spend "
+            f"FROM lead_metrics m JOIN sources s ON s.id = m.source_id "
+            f"GROUP BY {columns}) totals "
+            f"WHERE {matches}"
+        )
+
+    _drop_matviews()
+    _create_matviews(spend=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _drop_matviews()
+    _create_matviews(spend=False)
+    for table, _ in ROLLUPS:
+        op.drop_column(table, "spend")
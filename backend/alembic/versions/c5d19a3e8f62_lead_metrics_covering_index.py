@@ -0,0 +1,63 @@
+"""lead metrics covering index
+
+Replaces ix_lead_metrics_week_category_source with the same key columns
+INCLUDE (amount, leads_count), so date-range aggregates and the ranking
+endpoint over millions of lead_metrics rows run as index-only scans.
+The new index is built before the old one is dropped, both CONCURRENTLY.
+
+Revision ID: c5d19a3e8f62
+Revises: b3e0d5f27c41
+Create Date: 2026-10-18 22:04:51.306127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d19a3e8f62'
+down_revision: Union[str, None] = 'b3e0d5f27c41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = ["week_id", "category_id", "source_id"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_lead_metrics_week_category_source_covering",
+            "lead_metrics",
+            COLUMNS,
+            if_not_exists=True,
+            postgresql_include=["amount", "leads_count"],
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_lead_metrics_week_category_source",
+            table_name="lead_metrics",
+            if_exists=True,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_lead_metrics_week_category_source",
+            "lead_metrics",
+            COLUMNS,
+            if_not_exists=True,
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_lead_metrics_week_category_source_covering",
+            table_name="lead_metrics",
+            if_exists=True,
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.formats import negotiate_format
+from app.core.http_cache import cache_control, etag_matches
+from app.core.pagination import Page, decode_cursor, encode_cursor
+from app.db.session import get_read_session
+from app.services.data_version import request_data_version
+
+
+@dataclass(frozen=True)
+class PageParams:
+    limit: int | None
+    cursor: str | None
+
+    def after(self, *types: type) -> tuple | None:
+        return decode_cursor(self.cursor, types) if self.cursor else None
+
+    def meta(self, page: Page) -> dict | None:
+        if self.limit is None:
+            return None
+        return {
+            'limit': self.limit,
+            'next_cursor': encode_cursor(page.next_key) if page.next_key is not None else None
+        }
+
+
+def page_params(
+    limit: int | None = Query(None, ge=1, le=settings.PAGE_SIZE_MAX, description="Размер страницы"),
+    cursor: str | None = Query(None, description="Курсор следующей страницы")
+) -> PageParams:
+    # Without limit or cursor the endpoint keeps returning the full list
+    if cursor is not None and limit is None:
+        limit = settings.PAGE_SIZE_DEFAULT
+    return PageParams(limit=limit, cursor=cursor)
+
+
+async def conditional_get(request: Request, session: AsyncSession = Depends(get_read_session)) -> None:
+    """Answer 304 when the client already has the current data version.
+
+    The ETag is left in the request state for ETagMiddleware to put on the response.
+    The version is kept on the session, so results cached for it are the ones served.
+    """
+    version = await request_data_version(session)
+    # Representations negotiated through Accept share the URL, so they need their own tags
+    fmt = negotiate_format(request.headers, request.query_params.get('format'))
+    etag = f'"{version}"' if fmt == 'nested' else f'"{version}-{fmt}"'
+    request.state.etag = etag
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={'ETag': etag, 'Cache-Control': cache_control()}
+        )
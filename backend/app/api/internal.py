@@ -0,0 +1,59 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from app.core.config import settings
+from app.db.session import engine, read_engine, replica_router
+from app.schemas.pool import JobStats, PoolStats, ReplicaStats
+from app.schemas.response import ResponseModel
+
+
+def internal_endpoints_enabled():
+    # Pool, replica and job details describe the deployment: off unless asked for
+    if not settings.INTERNAL_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail='Not Found')
+
+
+router = APIRouter(
+    prefix='/internal',
+    tags=['Internal'],
+    dependencies=[Depends(internal_endpoints_enabled)],
+    include_in_schema=False
+)
+
+
+@router.get('/pool', response_model=ResponseModel[PoolStats])
+async def pool_stats():
+    return ResponseModel(
+        status='ok',
+        data=engine.pool.stats(),
+        message='Database connection pool counters'
+    )
+
+
+@router.get('/replica_pool', response_model=ResponseModel[Optional[PoolStats]])
+async def replica_pool_stats():
+    return ResponseModel(
+        status='ok',
+        data=read_engine.pool.stats() if read_engine else None,
+        message='Read replica connection pool counters' if read_engine else 'No read replica configured'
+    )
+
+
+@router.get('/replica', response_model=ResponseModel[Optional[ReplicaStats]])
+async def replica_stats():
+    return ResponseModel(
+        status='ok',
+        data=replica_router.stats() if replica_router else None,
+        message='Read replica routing' if replica_router else 'No read replica configured'
+    )
+
+
+@router.get('/jobs', response_model=ResponseModel[List[JobStats]])
+async def job_stats(request: Request):
+    scheduler = getattr(request.app.state, 'scheduler', None)
+    return ResponseModel(
+        status='ok',
+        data=scheduler.stats() if scheduler else [],
+        message='Background jobs'
+    )
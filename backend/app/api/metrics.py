@@ -0,0 +1,43 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.internal import router as internal_router
+from app.core.cache import dashboard_cache
+from app.core.metrics import CONTENT_TYPE, registry
+from app.db.session import engine, read_engine, replica_router
+
+router = APIRouter(tags=['Metrics'])
+router.include_router(internal_router)
+
+
+def _pool_samples(stat: str):
+    pools = [('primary', engine)] + ([('replica', read_engine)] if read_engine else [])
+    return [({'pool': name}, pool_engine.pool.stats()[stat]) for name, pool_engine in pools]
+
+
+def _cache_samples(stat: str):
+    return [({}, dashboard_cache.stats()[stat])]
+
+
+for stat in ('checked_out', 'overflow', 'size'):
+    registry.collected(f'db_pool_{stat}', f'Connection pool {stat.replace("_", " ")}.', 'gauge',
+                       lambda stat=stat: _pool_samples(stat))
+for stat in ('checkouts', 'timeouts'):
+    registry.collected(f'db_pool_{stat}_total', f'Connection pool {stat}.', 'counter',
+                       lambda stat=stat: _pool_samples(stat))
+registry.collected('db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection.', 'counter',
+                   lambda: _pool_samples('wait_seconds_total'))
+
+registry.collected('dashboard_cache_entries', 'Entries in the dashboard result cache.', 'gauge',
+                   lambda: _cache_samples('size'))
+for stat in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+    registry.collected(f'dashboard_cache_{stat}_total', f'Dashboard result cache {stat}.', 'counter',
+                       lambda stat=stat: _cache_samples(stat))
+
+registry.collected('db_replica_lag_seconds', 'Last measured read replica lag.', 'gauge',
+                   lambda: [({}, replica_router.stats()['lag_seconds'])] if replica_router else [])
+
+
+@router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -4,7 +4,9 @@ from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
+from app.api.dependencies import PageParams, conditional_get, page_params
+from app.core.pagination import paginate
+from app.db.session import get_read_session, get_session
 from app.schemas.category import CategoryRead, CategoryUpdate, CategoryCreate
 from app.services.category_service import *
 from app.schemas.response import ResponseModel
@@ -12,18 +14,23 @@ from app.schemas.response import ResponseModel
 router = APIRouter(prefix='/categories', tags=['Categories'])
 
 
-@router.get('/', response_model=ResponseModel[List[CategoryRead]])
-async def get_categories(session: AsyncSession = Depends(get_session)):
-    categories = await get_all_categories(session)
+@router.get('/', response_model=ResponseModel[List[CategoryRead]], dependencies=[Depends(conditional_get)])
+async def get_categories(
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_read_session)
+):
+    categories = await get_all_categories(session, page.after(int), page.limit)
+    result = paginate(categories, page.limit, key=lambda category: (category.id,))
     return ResponseModel(
         status='ok',
-        data=categories,
-        message='List all categories'
+        data=result.items,
+        message='List all categories',
+        meta=page.meta(result)
     )
 
 
-@router.get('/{category_id}', response_model=ResponseModel[CategoryRead])
-async def get_category(category_id: int, session: AsyncSession = Depends(get_session)):
+@router.get('/{category_id}', response_model=ResponseModel[CategoryRead], dependencies=[Depends(conditional_get)])
+async def get_category(category_id: int, session: AsyncSession = Depends(get_read_session)):
     category = await get_category_by_id(session, category_id)
     if not category:
         return JSONResponse(
@@ -1,63 +1,266 @@
-from typing import List
+from typing import List, Literal
 from datetime import date
 
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.db.session import get_session
+from app.api.dependencies import PageParams, conditional_get, page_params
+from app.core.cache import dashboard_cache
+from app.core.formats import ARROW_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE, columnar_to_arrow, negotiate_format, pyarrow
+from app.core.pagination import Page
+from app.core.responses import streamed_envelope, trusted_response
+from app.db.session import get_read_session, read_sessionmaker
 from app.schemas.response import ResponseModel
-from app.services.dashboard_service import get_lead_metrics_by_weeks, get_summary_stats_overview, get_stats_by_category, get_stats_by_source
+from app.services.aggregation import METRICS, AggregationQuery, RankingQuery, SeriesQuery
+from app.services.matviews import freshness_note, get_view_freshness, matviews_enabled
+from app.services.dashboard_service import get_aggregate, get_ranking, get_series, get_lead_metrics_by_weeks, get_lead_metrics_by_weeks_columnar, get_summary_stats_overview, get_stats_by_category, get_stats_by_source, get_stats_batch
 from app.schemas.lead_overview import LeadOverview
-from app.schemas.lead_stats import LeadStatsSummary
+from app.schemas.lead_stats import AggregateRow, LeadStatsBatch, LeadStatsSummary, RankingRow, SeriesPoint
 from app.schemas.lead_metrics_by_week import LeadMetricGroupedByWeekSchema
+from app.schemas.cache import CacheStats
 
 
 router = APIRouter(prefix='/dashboard', tags=['Dashboard'])
 
-@router.get('/lead_overview', response_model=ResponseModel[LeadOverview])
-async def get_lead_overview(session: AsyncSession = Depends(get_session)):
-    result = await get_summary_stats_overview(session)
+SeriesGrain = Literal['week', 'month', 'quarter', 'year']
+
+
+async def view_freshness(session: AsyncSession) -> dict | None:
+    """Freshness of the materialized views behind the aggregates, when they are used."""
+    return await get_view_freshness(session) if matviews_enabled(session) else None
+
+
+@router.get('/lead_overview', response_model=ResponseModel[LeadOverview], dependencies=[Depends(conditional_get)])
+async def get_lead_overview(
+    include_totals: bool = Query(False, description="Добавить общие итоги"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    result = await get_summary_stats_overview(session, include_totals)
+    freshness = await view_freshness(session)
     return ResponseModel(
         status='ok',
         data=result,
-        message='Lead overview summary'
+        message='Lead overview summary' + freshness_note(freshness),
+        meta=freshness
     )
 
-@router.get('/category/{category_id}', response_model=ResponseModel[LeadStatsSummary])
+@router.get('/category/{category_id}', response_model=ResponseModel[LeadStatsSummary], dependencies=[Depends(conditional_get)])
 async def category_stats(
     category_id: int,
     from_date: date | None = Query(None, description="Дата начала диапазона"),
     to_date: date | None = Query(None, description="Дата конца диапазона"),
-    session: AsyncSession = Depends(get_session)
+    grain: SeriesGrain = Query('week', description="Период: неделя или календарный месяц, квартал, год"),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    stats = await get_stats_by_category(session, category_id, from_date, to_date)
-    return ResponseModel(
-        status='ok',
-        data=stats,
-        message='Category stats calculated'
-    )
+    stats = await get_stats_by_category(session, category_id, from_date, to_date, grain)
+    freshness = await view_freshness(session)
+    return trusted_response(stats, 'Category stats calculated' + freshness_note(freshness), freshness)
 
-@router.get('/source/{source_id}', response_model=ResponseModel[LeadStatsSummary])
+@router.get('/source/{source_id}', response_model=ResponseModel[LeadStatsSummary], dependencies=[Depends(conditional_get)])
 async def source_stats(
     source_id: int,
     from_date: date | None = Query(None, description="Дата начала диапазона"),
     to_date: date | None = Query(None, description="Дата конца диапазона"),
-    session: AsyncSession = Depends(get_session)
+    grain: SeriesGrain = Query('week', description="Период: неделя или календарный месяц, квартал, год"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    stats = await get_stats_by_source(session, source_id, from_date, to_date, grain)
+    freshness = await view_freshness(session)
+    return trusted_response(stats, 'Source stats calculated' + freshness_note(freshness), freshness)
+
+
+@router.get('/stats', response_model=ResponseModel[LeadStatsBatch], dependencies=[Depends(conditional_get)])
+async def batch_stats(
+    category_ids: List[int] = Query([], description="Категории"),
+    source_ids: List[int] = Query([], description="Источники"),
+    from_date: date | None = Query(None, description="Дата начала диапазона"),
+    to_date: date | None = Query(None, description="Дата конца диапазона"),
+    grain: SeriesGrain = Query('week', description="Период: неделя или календарный месяц, квартал, год"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    stats = await get_stats_batch(
+        session,
+        tuple(sorted(set(category_ids))),
+        tuple(sorted(set(source_ids))),
+        from_date,
+        to_date,
+        grain
+    )
+    freshness = await view_freshness(session)
+    return trusted_response(stats, 'Batch stats calculated' + freshness_note(freshness), freshness)
+
+
+DIMENSION_SETS = {
+    'category': ('category',),
+    'source': ('source',),
+    'both': ('category', 'source'),
+}
+
+
+@router.get('/aggregate', response_model=ResponseModel[List[AggregateRow]], dependencies=[Depends(conditional_get)])
+async def aggregate_stats(
+    dimension: Literal['category', 'source', 'both'] = Query('category', description="Разрез"),
+    grain: Literal['week', 'month', 'quarter', 'year', 'total'] = Query('week', description="Период"),
+    metrics: List[str] = Query(['amount', 'leads_count', 'spend', 'lead_cost'], description="Показатели"),
+    category_ids: List[int] | None = Query(None, description="Только эти категории"),
+    source_ids: List[int] | None = Query(None, description="Только эти источники"),
+    from_date: date | None = Query(None, description="Дата начала диапазона"),
+    to_date: date | None = Query(None, description="Дата конца диапазона"),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    stats = await get_stats_by_source(session, source_id, from_date, to_date)
+    unknown = sorted(set(metrics) - METRICS.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {', '.join(unknown)}")
+
+    rows = await get_aggregate(session, AggregationQuery(
+        dimensions=DIMENSION_SETS[dimension],
+        grain=grain,
+        metrics=tuple(dict.fromkeys(metrics)),
+        category_ids=tuple(sorted(set(category_ids))) if category_ids else None,
+        source_ids=tuple(sorted(set(source_ids))) if source_ids else None,
+        from_date=from_date,
+        to_date=to_date
+    ))
+    freshness = await view_freshness(session)
     return ResponseModel(
         status='ok',
-        data=stats,
-        message='Source stats calculated'
+        data=rows,
+        message='Aggregate calculated' + freshness_note(freshness),
+        meta=freshness
     )
 
 
-@router.get('/lead_metrics_by_weeks', response_model=ResponseModel[List[LeadMetricGroupedByWeekSchema]])
-async def lead_metrics_by_weeks(session: AsyncSession = Depends(get_session)):
-    data = await get_lead_metrics_by_weeks(session)
+@router.get('/analytics', response_model=ResponseModel[List[SeriesPoint]], dependencies=[Depends(conditional_get)])
+async def analytics(
+    dimension: Literal['category', 'source'] = Query('category', description="Разрез"),
+    metric: Literal['amount', 'leads_count', 'spend', 'lead_cost'] = Query('leads_count', description="Показатель"),
+    ids: List[int] | None = Query(None, description="Только эти категории или источники"),
+    window: int = Query(4, ge=1, le=52, description="Окно скользящего среднего, недель"),
+    from_date: date | None = Query(None, description="Дата начала диапазона"),
+    to_date: date | None = Query(None, description="Дата конца диапазона"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    rows = await get_series(session, SeriesQuery(
+        dimension=dimension,
+        metric=metric,
+        window=window,
+        ids=tuple(sorted(set(ids))) if ids else None,
+        from_date=from_date,
+        to_date=to_date
+    ))
+    freshness = await view_freshness(session)
+    return trusted_response(rows, 'Analytics series calculated' + freshness_note(freshness), freshness)
+
+
+@router.get('/ranking', response_model=ResponseModel[List[RankingRow]], dependencies=[Depends(conditional_get)])
+async def ranking(
+    dimension: Literal['category', 'source', 'both'] = Query('both', description="Разрез: категории, источники или пары"),
+    metric: Literal['amount', 'leads_count', 'spend', 'lead_cost'] = Query('leads_count', description="Показатель"),
+    order: Literal['desc', 'asc'] = Query('desc', description="desc - лучшие по убыванию, asc - по возрастанию"),
+    limit: int = Query(10, ge=1, le=100, description="Сколько строк вернуть"),
+    per: Literal['category', 'source'] | None = Query(None, description="Топ внутри каждой категории или источника (для пар)"),
+    from_date: date | None = Query(None, description="Дата начала диапазона"),
+    to_date: date | None = Query(None, description="Дата конца диапазона"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    if per is not None and dimension != 'both':
+        raise HTTPException(status_code=400, detail="per is only supported with dimension=both")
+
+    rows = await get_ranking(session, RankingQuery(
+        dimensions=DIMENSION_SETS[dimension],
+        metric=metric,
+        descending=order == 'desc',
+        limit=limit,
+        per=per,
+        from_date=from_date,
+        to_date=to_date
+    ))
+    freshness = await view_freshness(session)
+    return trusted_response(rows, 'Ranking calculated' + freshness_note(freshness), freshness)
+
+
+async def _lead_metrics_by_weeks_chunks(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    page: PageParams,
+    after: tuple | None,
+    *filters
+):
+    # The request-scoped session is closed before a streaming body is sent,
+    # so the stream owns its session, like the lead metrics export.
+    async with sessionmaker() as session:
+        groups, next_key = await get_lead_metrics_by_weeks(session, after, page.limit, *filters)
+        async for chunk in streamed_envelope(
+            groups, 'Metrics by week successfully fetched', page.meta(Page([], next_key))
+        ):
+            yield chunk
+
+
+@router.get(
+    '/lead_metrics_by_weeks',
+    response_model=ResponseModel[List[LeadMetricGroupedByWeekSchema]],
+    responses={
+        200: {'content': {
+            COLUMNAR_MEDIA_TYPE: {},
+            ARROW_MEDIA_TYPE: {}
+        }},
+        406: {'description': 'Arrow requested but pyarrow is not installed'}
+    },
+    dependencies=[Depends(conditional_get)]
+)
+async def lead_metrics_by_weeks(
+    request: Request,
+    format: Literal['nested', 'columnar', 'arrow'] | None = Query(
+        None, description="Формат ответа; по умолчанию выбирается по заголовку Accept"
+    ),
+    from_date: date | None = Query(None, description="Дата начала диапазона"),
+    to_date: date | None = Query(None, description="Дата конца диапазона"),
+    category_ids: List[int] | None = Query(None, description="Только эти категории"),
+    source_ids: List[int] | None = Query(None, description="Только эти источники"),
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_read_session),
+    sessionmaker: async_sessionmaker[AsyncSession] = Depends(read_sessionmaker)
+):
+    fmt = negotiate_format(request.headers, format)
+    if fmt == 'arrow' and pyarrow is None:
+        raise HTTPException(status_code=406, detail='Arrow format is not available')
+
+    after = page.after(date, int)
+    filters = (
+        from_date,
+        to_date,
+        tuple(sorted(set(category_ids))) if category_ids else None,
+        tuple(sorted(set(source_ids))) if source_ids else None
+    )
+
+    if fmt == 'nested':
+        # Week groups are written as they are read, never held all at once
+        return StreamingResponse(
+            _lead_metrics_by_weeks_chunks(sessionmaker, page, after, *filters),
+            media_type='application/json'
+        )
+
+    result = await get_lead_metrics_by_weeks_columnar(session, after, page.limit, *filters)
+    if fmt == 'arrow':
+        meta = page.meta(result)
+        return Response(
+            columnar_to_arrow(result.items[0]),
+            media_type=ARROW_MEDIA_TYPE,
+            headers={'X-Next-Cursor': meta['next_cursor'] or ''} if meta else None
+        )
+    return trusted_response(
+        result.items[0],
+        'Metrics by week successfully fetched',
+        page.meta(result),
+        media_type=COLUMNAR_MEDIA_TYPE
+    )
+
+
+@router.get('/cache_stats', response_model=ResponseModel[CacheStats])
+async def cache_stats():
     return ResponseModel(
         status='ok',
-        data=data,
-        message='Metrics by week successfully fetched'
-    )
\ No newline at end of file
+        data=dashboard_cache.stats(),
+        message='Dashboard cache counters'
+    )
@@ -1,10 +1,16 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, Query, status
-from fastapi.responses import JSONResponse
-from sqlalchemy.ext.asyncio import AsyncSession
+import csv
+import io
+import json
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Body, Depends, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.db.session import get_session
-from app.schemas.lead_metric import LeadMetricRead, LeadMetricCreate, LeadMetricUpdate
+from app.api.dependencies import PageParams, page_params
+from app.core.config import settings
+from app.core.pagination import paginate
+from app.db.session import get_read_session, get_session, read_sessionmaker
+from app.schemas.lead_metric import LeadMetricRead, LeadMetricCreate, LeadMetricUpdate, LeadMetricBulkResult
 from app.services.lead_metric_service import *
 from app.schemas.response import ResponseModel
 
@@ -16,14 +22,64 @@ async def read_leads(
     week_id: Optional[int] = Query(None),
     category_id: Optional[int] = Query(None),
     source_id: Optional[int] = Query(None),
-    session: AsyncSession = Depends(get_session)
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    leads = await get_leads_filtered(session, week_id, category_id, source_id)
-    return ResponseModel(status='ok', data=leads, message='List all lead metrics')
+    leads = await get_leads_filtered(session, week_id, category_id, source_id, page.after(int), page.limit)
+    result = paginate(leads, page.limit, key=lambda lead: (lead.id,))
+    return ResponseModel(status='ok', data=result.items, message='List all lead metrics', meta=page.meta(result))
+
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+async def _export_chunks(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    export_format: str,
+    week_id: Optional[int],
+    category_id: Optional[int],
+    source_id: Optional[int]
+):
+    # The request-scoped session is closed before a streaming body is sent,
+    # so the export owns its session for the lifetime of the stream.
+    async with sessionmaker() as session:
+        header_written = False
+        async for batch in stream_lead_metric_batches(session, week_id, category_id, source_id):
+            if export_format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if not header_written:
+                    writer.writerow(column.key for column in EXPORT_COLUMNS)
+                    header_written = True
+                writer.writerows(batch)
+                yield buffer.getvalue()
+            else:
+                yield ''.join(json.dumps(row._asdict()) + '\n' for row in batch)
+
+        if export_format == 'csv' and not header_written:
+            yield ','.join(column.key for column in EXPORT_COLUMNS) + '\r\n'
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_lead_metrics(
+    format: Literal['ndjson', 'csv'] = Query('ndjson'),
+    week_id: Optional[int] = Query(None),
+    category_id: Optional[int] = Query(None),
+    source_id: Optional[int] = Query(None),
+    sessionmaker: async_sessionmaker[AsyncSession] = Depends(read_sessionmaker)
+):
+    return StreamingResponse(
+        _export_chunks(sessionmaker, format, week_id, category_id, source_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={'Content-Disposition': f'attachment; filename="lead_metrics.{format}"'}
+    )
 
 
 @router.get('/{metric_id}', response_model=ResponseModel[LeadMetricRead])
-async def get_lead_metric(metric_id: int, session: AsyncSession = Depends(get_session)):
+async def get_lead_metric(metric_id: int, session: AsyncSession = Depends(get_read_session)):
     metric = await get_lead_metric_by_id(session, metric_id)
     if not metric:
         return JSONResponse(
@@ -40,6 +96,19 @@ async def create_lead_metric(metric_data: LeadMetricCreate, session: AsyncSessio
     return ResponseModel(status='ok', data=metric, message=message)
 
 
+@router.post('/bulk', response_model=ResponseModel[LeadMetricBulkResult])
+async def bulk_upsert_lead_metrics_endpoint(
+    metrics_data: List[LeadMetricCreate] = Body(..., max_length=settings.LEAD_METRICS_BULK_MAX_ROWS),
+    session: AsyncSession = Depends(get_session)
+):
+    result = await bulk_upsert_lead_metrics(session, metrics_data)
+    return ResponseModel(
+        status='ok',
+        data=result,
+        message=f'{result.created} created, {result.updated} updated, {result.failed} failed'
+    )
+
+
 @router.put('/{metric_id}', response_model=ResponseModel[LeadMetricRead])
 async def update_lead_metric(
     metric_id: int,
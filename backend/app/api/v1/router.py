@@ -11,4 +11,4 @@ router.include_router(categories.router)
 router.include_router(lead_metrics.router)
 router.include_router(sources.router)
 router.include_router(dashboard.router)
-router.include_router(weeks.router)
\ No newline at end of file
+router.include_router(weeks.router)
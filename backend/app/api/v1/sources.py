@@ -4,7 +4,9 @@ from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
+from app.api.dependencies import PageParams, conditional_get, page_params
+from app.core.pagination import paginate
+from app.db.session import get_read_session, get_session
 from app.schemas.source import SourceRead, SourceCreate, SourceUpdate
 from app.services.source_service import *
 from app.schemas.response import ResponseModel
@@ -12,18 +14,23 @@ from app.schemas.response import ResponseModel
 router = APIRouter(prefix='/sources', tags=['Sources'])
 
 
-@router.get('/', response_model=ResponseModel[List[SourceRead]])
-async def get_sources(session: AsyncSession = Depends(get_session)):
-    sources = await get_all_sources(session)
+@router.get('/', response_model=ResponseModel[List[SourceRead]], dependencies=[Depends(conditional_get)])
+async def get_sources(
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_read_session)
+):
+    sources = await get_all_sources(session, page.after(int), page.limit)
+    result = paginate(sources, page.limit, key=lambda source: (source.id,))
     return ResponseModel(
         status='ok',
-        data=sources,
-        message='List all sources'
+        data=result.items,
+        message='List all sources',
+        meta=page.meta(result)
     )
 
 
-@router.get('/{source_id}', response_model=ResponseModel[SourceRead])
-async def get_source(source_id: int, session: AsyncSession = Depends(get_session)):
+@router.get('/{source_id}', response_model=ResponseModel[SourceRead], dependencies=[Depends(conditional_get)])
+async def get_source(source_id: int, session: AsyncSession = Depends(get_read_session)):
     source = await get_source_by_id(session, source_id)
     if not source:
         return JSONResponse(
@@ -1,3 +1,4 @@
+from datetime import date
 from typing import List
 
 from fastapi import APIRouter, Depends, status
@@ -7,7 +8,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.category import Category
 from app.db.models.lead_metric import LeadMetric
 from app.db.models.source import Source
-from app.db.session import get_session
+from app.api.dependencies import PageParams, conditional_get, page_params
+from app.core.pagination import paginate
+from app.db.session import get_read_session, get_session
 from app.schemas.lead_metric import CategoriesInWeekAndSourceResponse
 from app.schemas.week import SourcesInWeekResponse, WeekRead, WeekUpdate
 from app.services.week_service import *
@@ -16,18 +19,23 @@ from app.schemas.response import ResponseModel
 router = APIRouter(prefix='/weeks', tags=['Weeks'])
 
 
-@router.get('/', response_model=ResponseModel[List[WeekRead]])
-async def get_weeks(session: AsyncSession = Depends(get_session)):
-    week = await get_all_weeks(session)
+@router.get('/', response_model=ResponseModel[List[WeekRead]], dependencies=[Depends(conditional_get)])
+async def get_weeks(
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_read_session)
+):
+    weeks = await get_all_weeks(session, page.after(date, int), page.limit)
+    result = paginate(weeks, page.limit, key=lambda week: (week.start_date, week.id))
     return ResponseModel(
         status='ok',
-        data=week,
-        message='List all weeks'
+        data=result.items,
+        message='List all weeks',
+        meta=page.meta(result)
     )
 
 
-@router.get('/{week_id}', response_model=ResponseModel[WeekRead])
-async def get_week(week_id: int, session: AsyncSession = Depends(get_session)):
+@router.get('/{week_id}', response_model=ResponseModel[WeekRead], dependencies=[Depends(conditional_get)])
+async def get_week(week_id: int, session: AsyncSession = Depends(get_read_session)):
     week = await get_week_by_id(session, week_id)
     if not week:
         return JSONResponse(
@@ -47,8 +55,8 @@ async def get_week(week_id: int, session: AsyncSession = Depends(get_session)):
     )
 
 
-@router.get("/{week_id}/sources", response_model=SourcesInWeekResponse)
-async def get_sources_by_week(week_id: int, session: AsyncSession = Depends(get_session)):
+@router.get("/{week_id}/sources", response_model=SourcesInWeekResponse, dependencies=[Depends(conditional_get)])
+async def get_sources_by_week(week_id: int, session: AsyncSession = Depends(get_read_session)):
     stmt = (
         select(Source.id, Source.name)
         .join(LeadMetric)
@@ -60,8 +68,8 @@ async def get_sources_by_week(week_id: int, session: AsyncSession = Depends(get_
     return {"status": "ok", "data": sources, "message": "", "errors": None}
 
 
-@router.get("/{week_id}/sources/{source_id}/categories", response_model=CategoriesInWeekAndSourceResponse)
-async def get_categories_by_week_and_source(week_id: int, source_id: int, session: AsyncSession = Depends(get_session)):
+@router.get("/{week_id}/sources/{source_id}/categories", response_model=CategoriesInWeekAndSourceResponse, dependencies=[Depends(conditional_get)])
+async def get_categories_by_week_and_source(week_id: int, source_id: int, session: AsyncSession = Depends(get_read_session)):
     stmt = (
         select(Category.id, Category.name, LeadMetric.amount, LeadMetric.leads_count)
         .join(LeadMetric)
@@ -0,0 +1,205 @@
+import functools
+import inspect
+import sys
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Hashable, Iterable, NamedTuple
+
+from app.core.config import settings
+from app.services.data_version import request_data_version
+
+
+Period = tuple[date | None, date | None]
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    expires_at: float
+    tags: frozenset
+    window: Period
+    size: int
+
+
+def approximate_size(value: Any) -> int:
+    """Bytes held by `value` and the containers and objects it references, each counted once."""
+    seen = set()
+    pending = [value]
+    size = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        elif hasattr(item, "__dict__"):
+            pending.append(vars(item))
+    return size
+
+
+class TTLLRUCache:
+    """Bounded in-process cache with LRU eviction, per-entry TTL and tag invalidation.
+
+    Both the number of entries and their approximate size in bytes are bounded.
+    Every entry carries a set of tags and the date window it was computed for,
+    so writers can drop exactly the entries whose result they may have changed.
+    A result larger than the whole byte budget is not cached at all.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, maxbytes: int):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self.generation = 0
+        self.bytes = 0
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _remove(self, key: Hashable) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry.value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: Iterable[Hashable] = (),
+        window: Period = (None, None),
+        generation: int | None = None
+    ) -> None:
+        # A write landed while the value was being computed: it may be stale.
+        if generation is not None and generation != self.generation:
+            return
+
+        size = approximate_size(value)
+        if size > self.maxbytes:
+            self.oversized += 1
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CacheEntry(value, time.monotonic() + self.ttl, frozenset(tags), window, size)
+        self.bytes += size
+        while len(self._entries) > self.maxsize or self.bytes > self.maxbytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, tags: Iterable[Hashable], period: Period | None = None) -> int:
+        """Drop entries carrying any of `tags` whose window covers `period`.
+
+        `period` is the (start_date, end_date) of the week that changed; entries
+        filtered to a date range that excludes that week are kept.
+        """
+        tags = set(tags)
+        self.generation += 1
+
+        stale = [
+            key for key, entry in self._entries.items()
+            if entry.tags & tags and (period is None or _covers(entry.window, period))
+        ]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "maxbytes": self.maxbytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "oversized": self.oversized,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+
+def _covers(window: Period, period: Period) -> bool:
+    # Same rule the dashboard queries use to include a week in a date range
+    from_date, to_date = window
+    start_date, end_date = period
+    return (from_date is None or start_date >= from_date) and (to_date is None or end_date <= to_date)
+
+
+def cached(
+    cache: TTLLRUCache,
+    tags: Callable[[dict], Iterable[Hashable]],
+    window: Callable[[dict], Period] | None = None
+):
+    """Cache an async service function on its arguments and the data version.
+
+    The session is left out of the key, but the version the request reads from
+    it is part of it: writes from other workers move the version, so entries
+    computed before them are never served under the new ETag.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not settings.DASHBOARD_CACHE_ENABLED:
+                return await func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: value for name, value in bound.arguments.items() if name != "session"}
+            version = await request_data_version(bound.arguments["session"])
+            key = (func.__qualname__, version, *arguments.items())
+
+            found, value = cache.get(key)
+            if found:
+                return value
+
+            generation = cache.generation
+            value = await func(*args, **kwargs)
+            cache.set(
+                key,
+                value,
+                tags=tags(arguments),
+                window=window(arguments) if window else (None, None),
+                generation=generation
+            )
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+dashboard_cache = TTLLRUCache(
+    maxsize=settings.DASHBOARD_CACHE_MAXSIZE,
+    ttl=settings.DASHBOARD_CACHE_TTL,
+    maxbytes=settings.DASHBOARD_CACHE_MAXBYTES
+)
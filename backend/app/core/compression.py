@@ -0,0 +1,206 @@
+"""Response compression with gzip, and brotli or zstd when their packages are installed."""
+import zlib
+from typing import Callable, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoder
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional encoder
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "+json", "application/vnd.apache.arrow")
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+    def finish(self) -> bytes: ...
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync flush so each streamed chunk can be decoded as soon as it arrives
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings(levels: dict[str, int]) -> dict[str, Callable[[], Encoder]]:
+    """Encoder factories for the configured encodings whose packages are importable."""
+    factories = {"gzip": GzipEncoder}
+    if brotli is not None:
+        factories["br"] = BrotliEncoder
+    if zstandard is not None:
+        factories["zstd"] = ZstdEncoder
+    return {
+        name: (lambda factory=factories[name], level=level: factory(level))
+        for name, level in levels.items()
+        if name in factories
+    }
+
+
+def _accepted(accept_encoding: str) -> dict[str, float]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, preference: list[str]) -> str | None:
+    """First encoding in server `preference` order that the client accepts."""
+    accepted = _accepted(accept_encoding)
+    for name in preference:
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+def _weaken_etag(headers: MutableHeaders) -> None:
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """Compress text responses larger than `minimum_size`, including streamed bodies.
+
+    Single-message bodies below the threshold are sent as is. Streamed bodies are
+    compressed chunk by chunk with a flush after each one. ETags of compressed
+    responses are weakened, since the bytes differ per encoding.
+    """
+
+    def __init__(self, app: ASGIApp, levels: dict[str, int], minimum_size: int = 1024):
+        self.app = app
+        self.encoders = available_encodings(levels)
+        self.preference = list(self.encoders)
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.preference)
+        responder = _CompressingResponder(
+            send,
+            encoding,
+            self.encoders[encoding] if encoding else None,
+            self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(
+        self,
+        send: Send,
+        encoding: str | None,
+        encoder_factory: Callable[[], Encoder] | None,
+        minimum_size: int
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.encoder_factory = encoder_factory
+        self.minimum_size = minimum_size
+        self.start_message: Message | None = None
+        self.encoder: Encoder | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = MutableHeaders(scope=message)
+            if message["status"] == 304 and self.encoding:
+                # Same validator the full response would have carried
+                _weaken_etag(headers)
+            compressible = (
+                "content-encoding" not in headers
+                and message["status"] not in (204, 304)
+                and any(kind in headers.get("content-type", "") for kind in COMPRESSIBLE_TYPES)
+            )
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            self.passthrough = not compressible or self.encoding is None
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(scope=start)
+
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self.encoder = self.encoder_factory()
+            headers["Content-Encoding"] = self.encoding
+            _weaken_etag(headers)
+
+            if not more_body:
+                data = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(data))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": data})
+                return
+
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self._send(start)
+
+        data = self.encoder.compress(body) if body else b""
+        if not more_body:
+            data += self.encoder.finish()
+        if data or not more_body:
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
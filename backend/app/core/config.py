@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,6 +9,78 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
 
+    # Optional streaming replica serving dashboard and list reads
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None
+    DB_REPLICA_MAX_LAG: float = 5.0
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 1.0
+    # Reads stay on the primary this long after a write
+    DB_READ_YOUR_WRITES_WINDOW: float = 10.0
+
+    # Async engine and connection pool
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg prepared statements cached per connection; 0 disables (needed behind pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Statements slower than this are logged as warnings
+    DB_SLOW_QUERY_MS: float = 200.0
+
+    # Where dashboard aggregates are read from: raw lead_metrics, the rollup tables
+    # or the materialized views (falls back to the rollup tables outside PostgreSQL)
+    DASHBOARD_AGGREGATE_SOURCE: Literal["live", "rollup", "matview"] = "rollup"
+
+    # Materialized view refresh (DASHBOARD_AGGREGATE_SOURCE=matview, PostgreSQL only):
+    # wait this long after the last write, but never longer than the max delay
+    DASHBOARD_MATVIEW_REFRESH_DEBOUNCE: float = 2.0
+    DASHBOARD_MATVIEW_REFRESH_MAX_DELAY: float = 30.0
+
+    # Precomputed overview and per-category/source series (app/services/snapshots.py),
+    # rebuilt after writes (debounced, at most max delay late) and every interval
+    SNAPSHOTS_ENABLED: bool = True
+    SNAPSHOT_REFRESH_INTERVAL: float = 300.0
+    SNAPSHOT_REFRESH_DEBOUNCE: float = 1.0
+    SNAPSHOT_REFRESH_MAX_DELAY: float = 10.0
+
+    # In-memory NumPy cube of lead metrics (app/services/cube.py, needs numpy),
+    # reloaded every interval and after writes it could not patch in place
+    DASHBOARD_CUBE_ENABLED: bool = False
+    DASHBOARD_CUBE_MAX_CELLS: int = 10_000_000
+    DASHBOARD_CUBE_REFRESH_INTERVAL: float = 300.0
+    DASHBOARD_CUBE_REFRESH_DEBOUNCE: float = 1.0
+    DASHBOARD_CUBE_REFRESH_MAX_DELAY: float = 10.0
+
+    # In-process result cache for dashboard_service
+    DASHBOARD_CACHE_ENABLED: bool = True
+    DASHBOARD_CACHE_MAXSIZE: int = 1024
+    # Approximate memory budget of the cached results; a single larger result is not cached
+    DASHBOARD_CACHE_MAXBYTES: int = 64 * 2 ** 20
+    DASHBOARD_CACHE_TTL: float = 60.0
+
+    # Aggregations slower than this are logged as warnings
+    AGGREGATION_SLOW_MS: float = 500.0
+
+    LEAD_METRICS_BULK_MAX_ROWS: int = 50000
+
+    # Cache-Control max-age of ETag-validated responses; 0 makes clients revalidate every time
+    HTTP_CACHE_MAX_AGE: int = 0
+
+    # JSON pool, replica and background job stats under /internal, next to /metrics;
+    # they describe the deployment, so only enable them where the app is not public
+    INTERNAL_ENDPOINTS_ENABLED: bool = False
+
+    # Response compression; encodings in order of preference, brotli and zstd only when installed
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_LEVELS: dict[str, int] = {"zstd": 3, "br": 4, "gzip": 6}
+
+    # Keyset pagination of list endpoints
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+
     @property
     def database_url(self) -> str:
         return (
@@ -14,6 +88,15 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def replica_database_url(self) -> Optional[str]:
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_REPLICA_HOST}:{self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        )
+
     class Config:
         env_file = ".env"
 
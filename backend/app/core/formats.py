@@ -0,0 +1,68 @@
+"""Alternate wire formats for large dashboard payloads.
+
+Apache Arrow output needs pyarrow; without it only JSON formats are offered.
+"""
+from starlette.datastructures import Headers
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - optional format
+    pyarrow = None
+
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.dashboard.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Formats selectable by Accept header, besides the default nested JSON
+MEDIA_TYPE_FORMATS = {
+    COLUMNAR_MEDIA_TYPE: "columnar",
+    ARROW_MEDIA_TYPE: "arrow",
+}
+FORMATS = ("nested", "columnar", "arrow")
+
+
+def negotiate_format(headers: Headers, requested: str | None = None) -> str:
+    """The `format` query parameter wins; otherwise the first vendor type the client accepts."""
+    if requested in FORMATS:
+        return requested
+    for media_range in headers.get("accept", "").split(","):
+        media_type, _, params = media_range.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        fmt = MEDIA_TYPE_FORMATS.get(media_type.strip().lower())
+        if fmt:
+            return fmt
+    return "nested"
+
+
+def columnar_to_arrow(document: dict) -> bytes:
+    """Arrow IPC stream of the columnar document; names are dictionary-encoded."""
+    metrics = document["metrics"]
+    category_index = {category["id"]: i for i, category in enumerate(document["categories"])}
+    source_index = {source["id"]: i for i, source in enumerate(document["sources"])}
+    week_index = {week["id"]: i for i, week in enumerate(document["weeks"])}
+    week_positions = pyarrow.array([week_index[week_id] for week_id in metrics["week_id"]], pyarrow.int32())
+
+    table = pyarrow.table({
+        "lead_metric_id": pyarrow.array(metrics["lead_metric_id"], pyarrow.int64()),
+        "week_id": pyarrow.array(metrics["week_id"], pyarrow.int64()),
+        "start_date": pyarrow.array([week["start_date"] for week in document["weeks"]], pyarrow.date32()).take(week_positions),
+        "end_date": pyarrow.array([week["end_date"] for week in document["weeks"]], pyarrow.date32()).take(week_positions),
+        "category_id": pyarrow.array(metrics["category_id"], pyarrow.int64()),
+        "category": pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array([category_index[i] for i in metrics["category_id"]], pyarrow.int32()),
+            pyarrow.array([category["name"] for category in document["categories"]], pyarrow.string())
+        ),
+        "source_id": pyarrow.array(metrics["source_id"], pyarrow.int64()),
+        "source": pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array([source_index[i] for i in metrics["source_id"]], pyarrow.int32()),
+            pyarrow.array([source["name"] for source in document["sources"]], pyarrow.string())
+        ),
+        "amount": pyarrow.array(metrics["amount"], pyarrow.int64()),
+        "leads_count": pyarrow.array(metrics["leads_count"], pyarrow.int64()),
+    })
+
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,21 @@
+from app.core.config import settings
+
+
+def cache_control() -> str:
+    if settings.HTTP_CACHE_MAX_AGE > 0:
+        return f"private, max-age={settings.HTTP_CACHE_MAX_AGE}"
+    return "private, no-cache"
+
+
+def _opaque(tag: str) -> str:
+    # Weak comparison (RFC 9110 13.1.2): W/"x" and "x" match
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Generic, Sequence, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+T = TypeVar("T")
+
+# Types a cursor component can be decoded into
+CURSOR_DECODERS: dict[type, Callable[[Any], Any]] = {
+    int: int,
+    str: str,
+    date: date.fromisoformat,
+}
+
+
+@dataclass(frozen=True)
+class Page(Generic[T]):
+    items: list[T]
+    next_key: tuple | None = None
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, date) else value for value in key],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types: Sequence[type]) -> tuple:
+    """Decode an opaque cursor into a keyset tuple, 400 on anything malformed."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(types):
+            raise ValueError(token)
+        return tuple(CURSOR_DECODERS[kind](value) for kind, value in zip(types, raw))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset(query, columns: Sequence, after: tuple | None, limit: int | None):
+    """Order by `columns` and start strictly after the `after` key.
+
+    One extra row is fetched so the caller can tell whether a next page exists.
+    """
+    if after is not None:
+        query = query.where(tuple_(*columns) > tuple_(*after))
+    query = query.order_by(*columns)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def paginate(rows: Sequence[T], limit: int | None, key: Callable[[T], tuple]) -> Page[T]:
+    rows = list(rows)
+    if limit is None or len(rows) <= limit:
+        return Page(rows)
+    rows = rows[:limit]
+    return Page(rows, key(rows[-1]))
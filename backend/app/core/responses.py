@@ -0,0 +1,84 @@
+"""JSON rendering for API responses.
+
+orjson is used when it is installed and the stdlib json module otherwise;
+both produce the same documents.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        # SUM() over integer columns comes back as NUMERIC from PostgreSQL
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class of the app."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(
+    data: Any,
+    message: str,
+    meta: dict[str, Any] | None = None,
+    status: str = 'ok',
+    media_type: str | None = None
+) -> FastJSONResponse:
+    """A ResponseModel-shaped response serialized without another validation pass.
+
+    Only for data that is already validated (pydantic models) or built by the
+    service from typed columns in exactly the declared schema shape; the route's
+    response_model then only documents the payload.
+    """
+    return FastJSONResponse({
+        "status": status,
+        "data": data,
+        "message": message,
+        "errors": None,
+        "meta": meta
+    }, media_type=media_type)
+
+
+async def streamed_envelope(
+    items: AsyncIterable[Any],
+    message: str,
+    meta: dict[str, Any] | None = None,
+    status: str = 'ok'
+) -> AsyncIterator[bytes]:
+    """The trusted_response document, written one `data` item at a time.
+
+    For StreamingResponse bodies whose data list is too large to render at once.
+    """
+    yield b'{"status":' + dumps(status) + b',"data":['
+    separator = b''
+    async for item in items:
+        yield separator + dumps(item)
+        separator = b','
+    yield b'],"message":' + dumps(message) + b',"errors":null,"meta":' + dumps(meta) + b'}'
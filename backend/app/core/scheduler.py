@@ -0,0 +1,157 @@
+"""In-process asyncio scheduler for coalesced background jobs.
+
+A job runs when it is triggered and, optionally, every `interval` seconds.
+Triggers are coalesced: however many arrive while a job is waiting out its
+debounce or is already running, they cause at most one more run. A burst of
+writes therefore costs one recompute, started once the burst has been quiet
+for `debounce` seconds, or `max_delay` seconds after its first trigger.
+
+Jobs run in the process that started the scheduler; with several workers each
+keeps its own schedule.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        interval: float | None = None,
+        debounce: float = 0.0,
+        max_delay: float | None = None
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay if max_delay is not None else debounce
+        self.runs = 0
+        self.failures = 0
+        self.triggers = 0
+        self.last_run_at: float | None = None
+        self.last_duration: float | None = None
+        self._first_trigger: float | None = None
+        self._last_trigger = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def trigger(self) -> None:
+        now = time.monotonic()
+        self.triggers += 1
+        if self._first_trigger is None:
+            self._first_trigger = now
+        self._last_trigger = now
+        self._wakeup.set()
+
+    async def _wait_for_trigger(self) -> None:
+        """Wait for a trigger, or let the interval timer fire one."""
+        if self.interval is None:
+            await self._wakeup.wait()
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.interval)
+        except TimeoutError:
+            self.trigger()
+
+    async def _settle(self) -> None:
+        """Sleep until triggers have been quiet for `debounce` or `max_delay` has passed."""
+        while True:
+            deadline = min(self._last_trigger + self.debounce, self._first_trigger + self.max_delay)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except TimeoutError:
+                pass
+
+    async def run_forever(self) -> None:
+        while True:
+            await self._wait_for_trigger()
+            await self._settle()
+            # Triggers from here on land during the run and cause the next one
+            self._wakeup.clear()
+            self._first_trigger = None
+
+            started = time.perf_counter()
+            failed = False
+            try:
+                await self.func()
+                self.runs += 1
+            except Exception:
+                self.failures += 1
+                failed = True
+                logger.exception("Background job %s failed", self.name)
+            self.last_run_at = time.time()
+            self.last_duration = time.perf_counter() - started
+
+            if failed:
+                # Retry after a pause rather than spinning on a persistent error
+                await asyncio.sleep(self.max_delay or self.interval or 1.0)
+                self.trigger()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "debounce": self.debounce,
+            "max_delay": self.max_delay,
+            "triggers": self.triggers,
+            "runs": self.runs,
+            "failures": self.failures,
+            "pending": self._wakeup.is_set(),
+            "last_run_at": self.last_run_at,
+            "last_duration": self.last_duration
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: dict[str, Job] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        interval: float | None = None,
+        debounce: float = 0.0,
+        max_delay: float | None = None,
+        run_at_start: bool = True
+    ) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already scheduled")
+        job = self.jobs[name] = Job(name, func, interval, debounce, max_delay)
+        if run_at_start:
+            job.trigger()
+        return job
+
+    def trigger(self, name: str) -> None:
+        job = self.jobs.get(name)
+        if job is not None:
+            job.trigger()
+
+    def start(self) -> None:
+        for job in self.jobs.values():
+            if job._task is None:
+                job._task = asyncio.create_task(job.run_forever(), name=f"job-{job.name}")
+
+    async def stop(self) -> None:
+        for job in self.jobs.values():
+            if job._task is not None:
+                job._task.cancel()
+                try:
+                    await job._task
+                except asyncio.CancelledError:
+                    pass
+                job._task = None
+
+    def stats(self) -> list[dict]:
+        return [job.stats() for job in self.jobs.values()]
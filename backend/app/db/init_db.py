@@ -1,136 +1,206 @@
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+"""Seed the database with demo or synthetic data.
+
+    python -m app.db.init_db                      # demo categories, sources and weeks
+    python -m app.db.init_db --synthetic \\
+        --weeks 52 --categories 100 --sources 20  # N weeks x M categories x K sources
+    python -m app.db.init_db --tables-only        # create the tables for `alembic upgrade head`, no data
 
-from datetime import date
-import random
+Every step is a set-based INSERT that skips existing rows, so re-running is cheap and idempotent.
+"""
+import argparse
 import asyncio
+from datetime import date, timedelta
 
+from sqlalchemy import Integer, cast, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import dialect_name, upsert_insert
 from app.db.models.source import Source
 from app.db.session import async_session, create_tables
 from app.db.models import Category, Week, LeadMetric
 from app.schemas.enum.lead import LeadPricingType
-
-
-async def create_initial_data(session: AsyncSession):
-    # Create tables if not existing
-    await create_tables()
-
-    category_names = [
-        'Москва', 'Абакан', 'М+Р',
-        'Зеленоград', 'Адлер', 'Барнаул',
-        'Брянск', 'Казань'
+from app.services.data_version import bump_data_version
+from app.services.pricing import lead_spend, pricing_types
+from app.services.rollup_service import MetricDelta, apply_rollup_deltas, rebuild_rollups, rollups_populated
+
+
+# Above this many new metrics recomputing the rollups is cheaper than folding deltas
+ROLLUP_DELTA_MAX_ROWS = 10000
+
+AMOUNT_RANGE = (5000, 100000)
+LEADS_RANGE = (1, 100)
+
+CATEGORY_NAMES = [
+    'Москва', 'Абакан', 'М+Р',
+    'Зеленоград', 'Адлер', 'Барнаул',
+    'Брянск', 'Казань'
+]
+
+SOURCES = [
+    ('Яндекс.Поиск', LeadPricingType.TOTAL_DIVIDED),
+    ('Таргет Вконтакте', LeadPricingType.TOTAL_DIVIDED),
+    ('Посевы Telegram', LeadPricingType.TOTAL_DIVIDED),
+    ('Яндекс Карты МСК', LeadPricingType.TOTAL_DIVIDED),
+    ('Flocktory', LeadPricingType.FIXED_PER_LEAD),
+    ('TG ADS', LeadPricingType.TOTAL_DIVIDED)
+]
+
+WEEKS = [
+    (date(2024, 5, 29), date(2024, 6, 4)),
+    (date(2024, 6, 5), date(2024, 6, 11)),
+    (date(2024, 6, 12), date(2024, 6, 18)),
+    (date(2024, 6, 19), date(2024, 6, 24)),
+    (date(2024, 6, 26), date(2024, 7, 2)),
+    (date(2024, 7, 3), date(2024, 7, 9)),
+    (date(2024, 7, 10), date(2024, 7, 16)),
+    (date(2024, 7, 17), date(2024, 7, 24))
+]
+
+
+def synthetic_data(
+    weeks: int,
+    categories: int,
+    sources: int,
+    start_date: date
+) -> tuple[list[str], list[tuple[str, LeadPricingType]], list[tuple[date, date]]]:
+    category_names = [f'Категория {i:05d}' for i in range(1, categories + 1)]
+    source_rows = [
+        (
+            f'Источник {i:05d}',
+            LeadPricingType.FIXED_PER_LEAD if i % 5 == 0 else LeadPricingType.TOTAL_DIVIDED
+        )
+        for i in range(1, sources + 1)
     ]
-
-    sources_names = [
-        'Яндекс.Поиск', 'Таргет Вконтакте',
-        'Посевы Telegram', 'Яндекс Карты МСК',
-        'Flocktory', 'TG ADS'
+    week_rows = [
+        (start_date + timedelta(weeks=i), start_date + timedelta(weeks=i, days=6))
+        for i in range(weeks)
     ]
-
-    weeks_data = [
-        {
-            'start_date': date(2024, 5, 29),
-            'end_date': date(2024, 6, 4)
-        },
-        {
-            'start_date': date(2024, 6, 5),
-            'end_date': date(2024, 6, 11)
-        },
-        {
-            'start_date': date(2024, 6, 12),
-            'end_date': date(2024, 6, 18)
-        },
-        {
-            'start_date': date(2024, 6, 19),
-            'end_date': date(2024, 6, 24)
-        },
-        {
-            'start_date': date(2024, 6, 26),
-            'end_date': date(2024, 7, 2)
-        },
-        {
-            'start_date': date(2024, 7, 3),
-            'end_date': date(2024, 7, 9)
-        },
-        {
-            'start_date': date(2024, 7, 10),
-            'end_date': date(2024, 7, 16)
-        },
-        {
-            'start_date': date(2024, 7, 17),
-            'end_date': date(2024, 7, 24)
-        }
+    return category_names, source_rows, week_rows
+
+
+def _random_int(session: AsyncSession, low: int, high: int):
+    """Uniform integer in [low, high] computed by the database."""
+    span = high - low + 1
+    if dialect_name(session) == 'sqlite':
+        return func.abs(func.random() % span) + low
+    return cast(func.floor(func.random() * span), Integer) + low
+
+
+async def create_initial_data(
+    session: AsyncSession,
+    category_names: list[str] = CATEGORY_NAMES,
+    sources: list[tuple[str, LeadPricingType]] = SOURCES,
+    weeks: list[tuple[date, date]] = WEEKS
+) -> int:
+    """Insert the given dimensions and a metric for every combination missing one.
+
+    Returns the number of metrics created.
+    """
+    # Rollup tables added to an existing database start empty
+    needs_rollup_rebuild = not await rollups_populated(session)
+
+    await session.execute(
+        upsert_insert(session, Category)
+        .values([{'name': name} for name in category_names])
+        .on_conflict_do_nothing(index_elements=['name'])
+    )
+    await session.execute(
+        upsert_insert(session, Source)
+        .values([{'name': name, 'pricing_type': pricing_type} for name, pricing_type in sources])
+        .on_conflict_do_nothing(index_elements=['name'])
+    )
+
+    # weeks has no unique key to conflict on: look the dates up once, insert the rest
+    existing_weeks = set((await session.execute(
+        select(Week.start_date, Week.end_date)
+        .where(tuple_(Week.start_date, Week.end_date).in_(weeks))
+    )).tuples().all())
+    missing_weeks = [week for week in weeks if week not in existing_weeks]
+    if missing_weeks:
+        await session.execute(
+            Week.__table__.insert(),
+            [{'start_date': start_date, 'end_date': end_date} for start_date, end_date in missing_weeks]
+        )
+
+    combinations = (
+        select(
+            Category.id,
+            Source.id,
+            Week.id,
+            _random_int(session, *AMOUNT_RANGE),
+            _random_int(session, *LEADS_RANGE)
+        )
+        .select_from(Category)
+        .join(Source, Source.name.in_([name for name, _ in sources]))
+        .join(Week, tuple_(Week.start_date, Week.end_date).in_(weeks))
+        .where(Category.name.in_(category_names))
+    )
+    insert_stmt = upsert_insert(session, LeadMetric).from_select(
+        ['category_id', 'source_id', 'week_id', 'amount', 'leads_count'],
+        combinations
+    )
+    result = await session.execute(
+        insert_stmt
+        .on_conflict_do_nothing(index_elements=['category_id', 'source_id', 'week_id'])
+        .returning(
+            LeadMetric.category_id,
+            LeadMetric.source_id,
+            LeadMetric.week_id,
+            LeadMetric.amount,
+            LeadMetric.leads_count
+        )
+    )
+    rows = result.all()
+    pricing = await pricing_types(session, {row.source_id for row in rows})
+    created = [
+        MetricDelta(
+            category_id, source_id, week_id, amount, leads_count, 1,
+            lead_spend(amount, leads_count, pricing[source_id])
+        )
+        for category_id, source_id, week_id, amount, leads_count in rows
     ]
 
-    # Add Initial Categories
-    for name in category_names:
-        result = await session.execute(select(Category).where(Category.name == name))
-        existing = result.scalar_one_or_none()
-        if not existing:
-            session.add(Category(name=name))
-
-    # Add initial Sources
-    for name in sources_names:
-        result = await session.execute(select(Source).where(Source.name == name))
-        existing = result.scalar_one_or_none()
-        pricing_type = LeadPricingType.TOTAL_DIVIDED
-        if name == 'Flocktory':
-            pricing_type = LeadPricingType.FIXED_PER_LEAD
-        if not existing:
-            session.add(Source(name=name, pricing_type=pricing_type))
-
-    # Add initial Weeks
-    for el in weeks_data:
-        result = await session.execute(select(Week).where(
-            Week.start_date == el['start_date'],
-            Week.end_date == el['end_date']
-        ))
-        existing = result.scalar_one_or_none()
-        if not existing:
-            session.add(Week(start_date=el['start_date'], end_date=el['end_date']))
-
-    categories = (await session.execute(select(Category))).scalars().all()
-    sources = (await session.execute(select(Source))).scalars().all()
-    weeks = (await session.execute(select(Week))).scalars().all()
-
-    for category in categories:
-        for source in sources:
-            for week in weeks:
-                result = await session.execute(
-                    select(LeadMetric).where(
-                        (LeadMetric.category_id == category.id) &
-                        (LeadMetric.source_id == source.id) &
-                        (LeadMetric.week_id == week.id)
-                    )
-                )
-                existing = result.scalar_one_or_none()
-                if existing:
-                    continue
-
-                # existing = await session.execute(
-                #     select(LeadMetric).where(
-                #         LeadMetric.category_id == category.id,
-                #         LeadMetric.source_id == source.id
-                #     )
-                # )
-                # if not existing.scalar_one_or_none():
-                session.add(LeadMetric(
-                category_id=category.id,
-                source_id=source.id,
-                week_id=week.id,
-                amount=random.randint(5000, 100000),
-                leads_count=random.randint(1, 100)
-            ))
+    if needs_rollup_rebuild or len(created) > ROLLUP_DELTA_MAX_ROWS:
+        await rebuild_rollups(session)
+    else:
+        await apply_rollup_deltas(session, created)
 
     await session.commit()
+    await bump_data_version(session)
+    return len(created)
 
 
-
-async def init_db():
+async def init_db(
+    category_names: list[str] = CATEGORY_NAMES,
+    sources: list[tuple[str, LeadPricingType]] = SOURCES,
+    weeks: list[tuple[date, date]] = WEEKS
+) -> int:
+    await create_tables()
     async with async_session() as session:
-        await create_initial_data(session)
+        return await create_initial_data(session, category_names, sources, weeks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', action='store_true', help='generate a synthetic load instead of the demo data')
+    parser.add_argument('--weeks', type=int, default=52, help='synthetic weeks (N)')
+    parser.add_argument('--categories', type=int, default=100, help='synthetic categories (M)')
+    parser.add_argument('--sources', type=int, default=20, help='synthetic sources (K)')
+    parser.add_argument('--start-date', type=date.fromisoformat, default=date(2024, 1, 1), help='first synthetic week')
+    parser.add_argument('--tables-only', action='store_true', help='create the tables and stop before seeding')
+    args = parser.parse_args()
+
+    if args.tables_only:
+        asyncio.run(create_tables())
+        return
+
+    data = ()
+    if args.synthetic:
+        data = synthetic_data(args.weeks, args.categories, args.sources, args.start_date)
+
+    created = asyncio.run(init_db(*data))
+    print(f'Seeded {created} lead metrics')
 
 
 if __name__ == "__main__":
-    asyncio.run(init_db())
+    main()
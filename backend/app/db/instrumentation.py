@@ -0,0 +1,56 @@
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.metrics import DB_SLOW_STATEMENTS, DB_STATEMENT_DURATION, DB_STATEMENT_ROWS
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_STATEMENT_LOG_CHARS = 1000
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip(" \n\t(").split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+    operation = _operation(statement)
+
+    DB_STATEMENT_DURATION.observe(elapsed, operation=operation)
+    # SELECT row counts are only known once fetched; drivers report -1 for them
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        DB_STATEMENT_ROWS.observe(cursor.rowcount, operation=operation)
+
+    if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        DB_SLOW_STATEMENTS.inc(operation=operation)
+        logger.warning(
+            "Slow statement: %.1f ms%s\n%s",
+            elapsed * 1000,
+            " (executemany)" if executemany else "",
+            statement[:SLOW_STATEMENT_LOG_CHARS]
+        )
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("statement_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> AsyncEngine:
+    """Time every statement executed through `engine`."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    return engine
@@ -2,5 +2,14 @@ from .category import Category
 from .week import Week
 from .lead_metric import LeadMetric
 from .source import Source
+from .lead_rollup import WeekCategoryRollup, WeekSourceRollup, CategoryRollup, SourceRollup
+from .data_version import DataVersion
+from .view_refresh import ViewRefresh
+from .lead_matview import WeekCategoryView, WeekSourceView, CategoryView, SourceView, MATVIEWS
 
-__all__ = ["Category", "Week", "LeadMetric", "Source"]
+__all__ = [
+    "Category", "Week", "LeadMetric", "Source",
+    "WeekCategoryRollup", "WeekSourceRollup", "CategoryRollup", "SourceRollup",
+    "DataVersion", "ViewRefresh",
+    "WeekCategoryView", "WeekSourceView", "CategoryView", "SourceView", "MATVIEWS"
+]
@@ -0,0 +1,57 @@
+"""Read-only mappings of the dashboard materialized views.
+
+The views are created by an Alembic migration (PostgreSQL only) and mirror the
+rollup tables. They live in their own metadata so Base.metadata.create_all never
+tries to create them as tables.
+"""
+from sqlalchemy import BigInteger, Integer
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+class ViewBase(DeclarativeBase):
+    pass
+
+
+class WeekCategoryView(ViewBase):
+    __tablename__ = "mv_lead_week_category"
+
+    week_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    category_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger)
+    leads_count: Mapped[int] = mapped_column(BigInteger)
+    spend: Mapped[int] = mapped_column(BigInteger)
+    metrics_count: Mapped[int] = mapped_column(BigInteger)
+
+
+class WeekSourceView(ViewBase):
+    __tablename__ = "mv_lead_week_source"
+
+    week_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    source_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger)
+    leads_count: Mapped[int] = mapped_column(BigInteger)
+    spend: Mapped[int] = mapped_column(BigInteger)
+    metrics_count: Mapped[int] = mapped_column(BigInteger)
+
+
+class CategoryView(ViewBase):
+    __tablename__ = "mv_lead_category"
+
+    category_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger)
+    leads_count: Mapped[int] = mapped_column(BigInteger)
+    spend: Mapped[int] = mapped_column(BigInteger)
+    metrics_count: Mapped[int] = mapped_column(BigInteger)
+
+
+class SourceView(ViewBase):
+    __tablename__ = "mv_lead_source"
+
+    source_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger)
+    leads_count: Mapped[int] = mapped_column(BigInteger)
+    spend: Mapped[int] = mapped_column(BigInteger)
+    metrics_count: Mapped[int] = mapped_column(BigInteger)
+
+
+MATVIEWS = (WeekCategoryView, WeekSourceView, CategoryView, SourceView)
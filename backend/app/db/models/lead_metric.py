@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, Integer, UniqueConstraint
 
 from app.db.base import Base
 
@@ -7,6 +7,14 @@ class LeadMetric(Base):
     __tablename__ = "lead_metrics"
     __table_args__ = (
         UniqueConstraint("category_id", "source_id", "week_id", name="uq_category_source_week"),
+        # Covering: date-range aggregates and rankings read only this index
+        Index(
+            "ix_lead_metrics_week_category_source_covering",
+            "week_id", "category_id", "source_id",
+            postgresql_include=["amount", "leads_count"]
+        ),
+        Index("ix_lead_metrics_source_week", "source_id", "week_id"),
+        Index("ix_lead_metrics_category_week", "category_id", "week_id"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -0,0 +1,54 @@
+from sqlalchemy import BigInteger, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class WeekCategoryRollup(Base):
+    """Sum of lead metrics per (week, category), maintained on every metric write."""
+    __tablename__ = "lead_rollup_week_category"
+
+    week_id: Mapped[int] = mapped_column(ForeignKey("weeks.id", ondelete="CASCADE"), primary_key=True)
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    leads_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # amount for TOTAL_DIVIDED sources, amount * leads_count for FIXED_PER_LEAD ones
+    spend: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    metrics_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class WeekSourceRollup(Base):
+    """Sum of lead metrics per (week, source), maintained on every metric write."""
+    __tablename__ = "lead_rollup_week_source"
+
+    week_id: Mapped[int] = mapped_column(ForeignKey("weeks.id", ondelete="CASCADE"), primary_key=True)
+    source_id: Mapped[int] = mapped_column(ForeignKey("sources.id", ondelete="CASCADE"), primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    leads_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # amount for TOTAL_DIVIDED sources, amount * leads_count for FIXED_PER_LEAD ones
+    spend: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    metrics_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class CategoryRollup(Base):
+    """All-time sum of lead metrics per category."""
+    __tablename__ = "lead_rollup_category"
+
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    leads_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # amount for TOTAL_DIVIDED sources, amount * leads_count for FIXED_PER_LEAD ones
+    spend: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    metrics_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class SourceRollup(Base):
+    """All-time sum of lead metrics per source."""
+    __tablename__ = "lead_rollup_source"
+
+    source_id: Mapped[int] = mapped_column(ForeignKey("sources.id", ondelete="CASCADE"), primary_key=True)
+    amount: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    leads_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # amount for TOTAL_DIVIDED sources, amount * leads_count for FIXED_PER_LEAD ones
+    spend: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    metrics_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ViewRefresh(Base):
+    """When the dashboard materialized views were last refreshed, and which data version they contain."""
+    __tablename__ = "dashboard_view_refresh"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    data_version: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Date, Computed, String
+from sqlalchemy import Date, Computed, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from datetime import date
@@ -8,6 +8,9 @@ from app.db.base import Base
 
 class Week(Base):
     __tablename__ = "weeks"
+    __table_args__ = (
+        Index("ix_weeks_start_date_end_date", "start_date", "end_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     start_date: Mapped[date] = mapped_column(Date, nullable=False)
@@ -0,0 +1,95 @@
+"""Routing of read-only sessions between the primary and a read replica."""
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+logger = logging.getLogger(__name__)
+
+# Set on responses to writes; while it has not expired the client reads from the primary
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# Replication delay in seconds; an idle primary with a fully replayed replica is not lagging
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    """Decides per request whether a read may be served by the replica.
+
+    Reads go to the primary when the replica lag exceeds `max_lag`, when the lag
+    cannot be measured, when the client wrote recently (read-your-writes cookie),
+    or when this process handled a write within `write_window` seconds, so that
+    dashboard results cached after an invalidation are not computed from a
+    replica that has not caught up yet.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_lag: float, check_interval: float, write_window: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.write_window = write_window
+        self._lag: float | None = None
+        self._checked_at = float("-inf")
+        self._last_write = float("-inf")
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def note_write(self) -> None:
+        self._last_write = time.monotonic()
+
+    async def lag(self) -> float | None:
+        """Replica lag in seconds, re-measured at most every `check_interval`."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._lag
+
+        # Claim the check before awaiting so concurrent requests reuse the last value
+        self._checked_at = now
+        if self.engine.dialect.name != "postgresql":
+            self._lag = 0.0
+            return self._lag
+        try:
+            async with self.engine.connect() as conn:
+                self._lag = float(await conn.scalar(REPLICA_LAG_QUERY))
+        except (SQLAlchemyError, OSError) as error:
+            logger.warning("Replica lag check failed, reading from primary: %s", error)
+            self._lag = None
+        return self._lag
+
+    async def use_replica(self, primary_until: str | None = None) -> bool:
+        use_replica = await self._use_replica(primary_until)
+        if use_replica:
+            self.replica_reads += 1
+        else:
+            self.primary_reads += 1
+        return use_replica
+
+    async def _use_replica(self, primary_until: str | None) -> bool:
+        if primary_until:
+            try:
+                if float(primary_until) > time.time():
+                    return False
+            except ValueError:
+                pass
+        if time.monotonic() - self._last_write < self.write_window:
+            return False
+
+        lag = await self.lag()
+        return lag is not None and lag <= self.max_lag
+
+    def stats(self) -> dict:
+        return {
+            "lag_seconds": self._lag,
+            "max_lag_seconds": self.max_lag,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads
+        }
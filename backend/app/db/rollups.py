@@ -0,0 +1,48 @@
+"""Rebuild or verify the lead rollup tables.
+
+    python -m app.db.rollups           # recompute all rollups from lead_metrics
+    python -m app.db.rollups --check   # report rollup rows that drifted from lead_metrics
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db.session import async_session
+from app.services.rollup_service import check_rollups, rebuild_rollups
+
+
+async def rebuild() -> None:
+    async with async_session() as session:
+        await rebuild_rollups(session)
+        await session.commit()
+    print("Rollups rebuilt")
+
+
+async def check() -> bool:
+    async with async_session() as session:
+        mismatches = await check_rollups(session)
+
+    consistent = True
+    for table, rows in mismatches.items():
+        if not rows:
+            print(f"{table}: ok")
+            continue
+        consistent = False
+        print(f"{table}: {len(rows)} mismatched rows")
+        for row in rows:
+            print(f"  {row}")
+    return consistent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only compare rollups with lead_metrics")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if asyncio.run(check()) else 1)
+    asyncio.run(rebuild())
+
+
+if __name__ == "__main__":
+    main()
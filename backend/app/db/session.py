@@ -1,15 +1,52 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 
 from typing import AsyncGenerator
 
 from app.core.config import settings
 from app.db.base import Base
+from app.db.instrumentation import instrument_engine
+from app.db.pool import InstrumentedQueuePool
+from app.db.replica import READ_PRIMARY_COOKIE, ReplicaRouter
 
 
-engine = create_async_engine(settings.database_url, echo=True)
+def create_engine(url: str) -> AsyncEngine:
+    return instrument_engine(create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # SQLAlchemy's prepared statement cache and asyncpg's own statement cache
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        }
+    ))
+
+
+engine = create_engine(settings.database_url)
 
 async_session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+# Without a configured replica every read goes to the primary
+read_engine = create_engine(settings.replica_database_url) if settings.replica_database_url else None
+
+async_read_session = (
+    async_sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+    if read_engine else async_session
+)
+
+replica_router = ReplicaRouter(
+    read_engine,
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL,
+    write_window=settings.DB_READ_YOUR_WRITES_WINDOW
+) if read_engine else None
+
 async def create_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -18,3 +55,16 @@ async def create_tables():
 async def get_session() -> AsyncGenerator[AsyncSession]:
     async with async_session() as session:
         yield session
+
+
+async def read_sessionmaker(request: Request) -> async_sessionmaker[AsyncSession]:
+    """Replica sessions when it is safe to read from the replica, primary otherwise."""
+    if replica_router and await replica_router.use_replica(request.cookies.get(READ_PRIMARY_COOKIE)):
+        return async_read_session
+    return async_session
+
+
+# Dependency for read-only endpoints
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession]:
+    async with (await read_sessionmaker(request))() as session:
+        yield session
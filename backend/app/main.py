@@ -3,21 +3,78 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db.init_db import init_db
+from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.middleware import ETagMiddleware, MetricsMiddleware, ReadYourWritesMiddleware
+from app.db.session import async_session, create_tables, engine, replica_router
+from app.core.scheduler import Scheduler
+from app.services.cube import cube_enabled, refresh_cube
+from app.services.dashboard_service import refresh_snapshot
+from app.services.invalidation import off_data_changed, on_data_changed
+from app.services.matviews import MATVIEW_DIALECTS, refresh_matviews
+from app.api.metrics import router as metrics_router
 from app.api.v1.router import router as api_v1_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db() # Initial database
+    await create_tables() # Seeding runs separately: python -m app.db.init_db
+
+    scheduler = Scheduler()
+    if settings.SNAPSHOTS_ENABLED:
+        scheduler.add(
+            "snapshots",
+            lambda: refresh_snapshot(async_session),
+            interval=settings.SNAPSHOT_REFRESH_INTERVAL,
+            debounce=settings.SNAPSHOT_REFRESH_DEBOUNCE,
+            max_delay=settings.SNAPSHOT_REFRESH_MAX_DELAY
+        )
+    # Jobs to trigger after a write; with materialized views the snapshots wait for their refresh
+    write_jobs = ["snapshots"]
+    if settings.DASHBOARD_AGGREGATE_SOURCE == "matview" and engine.dialect.name in MATVIEW_DIALECTS:
+        async def refresh_views():
+            await refresh_matviews(engine, async_session)
+            scheduler.trigger("snapshots")
+
+        scheduler.add(
+            "matviews",
+            refresh_views,
+            debounce=settings.DASHBOARD_MATVIEW_REFRESH_DEBOUNCE,
+            max_delay=settings.DASHBOARD_MATVIEW_REFRESH_MAX_DELAY
+        )
+        write_jobs = ["matviews"]
+    if cube_enabled():
+        # Metric writes patch the cube in place; the job reloads it after any other change
+        scheduler.add(
+            "cube",
+            lambda: refresh_cube(async_session),
+            interval=settings.DASHBOARD_CUBE_REFRESH_INTERVAL,
+            debounce=settings.DASHBOARD_CUBE_REFRESH_DEBOUNCE,
+            max_delay=settings.DASHBOARD_CUBE_REFRESH_MAX_DELAY
+        )
+        write_jobs.append("cube")
+
+    def data_changed():
+        for name in write_jobs:
+            scheduler.trigger(name)
+
+    on_data_changed(data_changed)
+    scheduler.start()
+    app.state.scheduler = scheduler
+
     yield
 
+    off_data_changed(data_changed)
+    await scheduler.stop()
+
 
 app = FastAPI(
     debug=True,
     title='Irbis Dashboard',
     version='0.0.1',
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(
@@ -28,6 +85,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if replica_router:
+    app.add_middleware(
+        ReadYourWritesMiddleware,
+        window=settings.DB_READ_YOUR_WRITES_WINDOW,
+        on_write=replica_router.note_write
+    )
+
+app.add_middleware(ETagMiddleware)
+
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        levels=settings.COMPRESSION_LEVELS,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE
+    )
+
+# Outermost, so the timing covers every other middleware
+app.add_middleware(MetricsMiddleware)
+
 
 app.include_router(api_v1_router)
+app.include_router(metrics_router)
 
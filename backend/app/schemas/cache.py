@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    bytes: int
+    maxbytes: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    oversized: int
+    expirations: int
+    invalidations: int
@@ -2,4 +2,9 @@ from enum import Enum
 
 class LeadPricingType(str, Enum):
     FIXED_PER_LEAD = "fixed_per_lead"
-    TOTAL_DIVIDED = "total_divided"
\ No newline at end of file
+    TOTAL_DIVIDED = "total_divided"
+
+class BulkRowStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    FAILED = "failed"
@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from app.schemas.enum.lead import BulkRowStatus
+
 
 class LeadMetricRead(BaseModel):
     id: int
@@ -38,4 +40,17 @@ class CategoriesInWeekAndSourceResponse(BaseModel):
     status: str = "ok"
     data: list[CategoryInWeekAndSource]
     message: str = "Categories in week and source"
-    errors: None | str = None
\ No newline at end of file
+    errors: None | str = None
+
+class LeadMetricBulkRowResult(BaseModel):
+    index: int
+    status: BulkRowStatus
+    id: int | None = None
+    error: str | None = None
+
+
+class LeadMetricBulkResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    items: list[LeadMetricBulkRowResult]
@@ -28,3 +28,23 @@ class LeadMetricGroupedByWeekSchema(BaseModel):
     start_date: date
     end_date: date
     metrics: List[LeadMetricItemSchema]
+
+
+class WeekColumnarSchema(BaseModel):
+    id: int
+    start_date: date
+    end_date: date
+
+class LeadMetricColumns(BaseModel):
+    lead_metric_id: List[int]
+    week_id: List[int]
+    category_id: List[int]
+    source_id: List[int]
+    amount: List[int]
+    leads_count: List[int]
+
+class LeadMetricsByWeeksColumnar(BaseModel):
+    categories: List[CategorySchema]
+    sources: List[SourceSchema]
+    weeks: List[WeekColumnarSchema]
+    metrics: LeadMetricColumns
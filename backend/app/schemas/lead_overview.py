@@ -1,5 +1,12 @@
+"""All-time lead totals per category and source.
+
+`total_amount` is the raw sum of the reported `amount`, which is a price per
+lead for FIXED_PER_LEAD sources and a total for TOTAL_DIVIDED ones, so it mixes
+units whenever both kinds are summed. `total_spend` and `lead_cost` apply each
+source's pricing (app/services/pricing.py) and are the figures to compare.
+"""
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 
 class CategorySummary(BaseModel):
@@ -7,6 +14,8 @@ class CategorySummary(BaseModel):
     category_name: str
     total_leads: int
     total_amount: float
+    total_spend: float
+    lead_cost: Optional[float] = None
 
 
 class SourceSummary(BaseModel):
@@ -14,8 +23,18 @@ class SourceSummary(BaseModel):
     source_name: str
     total_leads: int
     total_amount: float
+    total_spend: float
+    lead_cost: Optional[float] = None
+
+
+class OverviewTotals(BaseModel):
+    total_leads: int
+    total_amount: float
+    total_spend: float
+    lead_cost: Optional[float] = None
 
 
 class LeadOverview(BaseModel):
     by_category: List[CategorySummary]
     by_source: List[SourceSummary]
+    totals: Optional[OverviewTotals] = None
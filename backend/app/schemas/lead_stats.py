@@ -1,8 +1,11 @@
+from datetime import date
+
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class WeeklyStats(BaseModel):
-    id: int
+    # Week id; empty for month, quarter and year buckets
+    id: Optional[int] = None
     lead_metric_id: Optional[int] = None
     source_id: Optional[int] = None
     category_id: Optional[int] = None
@@ -10,12 +13,53 @@ class WeeklyStats(BaseModel):
     end_date: str
     leads_count: int
     amount: int
+    spend: int | None = None
     lead_cost: float | None = None
 
 class LeadStatsSummary(BaseModel):
     total_leads: int
     total_amount: int
+    total_spend: Optional[int] = None
     lead_cost: Optional[float] = None
     weekly_stats: List[WeeklyStats]
 
-    
\ No newline at end of file
+
+class LeadStatsBatch(BaseModel):
+    categories: Dict[int, LeadStatsSummary]
+    sources: Dict[int, LeadStatsSummary]
+
+
+class AggregateRow(BaseModel):
+    category_id: Optional[int] = None
+    source_id: Optional[int] = None
+    week_id: Optional[int] = None
+    period_start: Optional[date] = None
+    period_end: Optional[date] = None
+    amount: Optional[int] = None
+    leads_count: Optional[int] = None
+    spend: Optional[int] = None
+    lead_cost: Optional[float] = None
+
+
+class RankingRow(BaseModel):
+    rank: int
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    source_id: Optional[int] = None
+    source_name: Optional[str] = None
+    amount: int
+    leads_count: int
+    spend: int
+    lead_cost: Optional[float] = None
+
+
+class SeriesPoint(BaseModel):
+    category_id: Optional[int] = None
+    source_id: Optional[int] = None
+    week_id: int
+    period_start: date
+    period_end: date
+    value: Optional[float] = None
+    change: Optional[float] = None
+    moving_avg: Optional[float] = None
+    cumulative: Optional[float] = None
@@ -0,0 +1,36 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    timeout: float
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class ReplicaStats(BaseModel):
+    lag_seconds: Optional[float]
+    max_lag_seconds: float
+    replica_reads: int
+    primary_reads: int
+
+
+class JobStats(BaseModel):
+    name: str
+    interval: Optional[float]
+    debounce: float
+    max_delay: float
+    triggers: int
+    runs: int
+    failures: int
+    pending: bool
+    last_run_at: Optional[float]
+    last_duration: Optional[float]
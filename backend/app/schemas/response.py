@@ -1,10 +1,11 @@
 from typing import Generic, TypeVar, Optional, Any
-from pydantic.generics import GenericModel
+from pydantic import BaseModel
 
 T = TypeVar("T")
 
-class ResponseModel(GenericModel, Generic[T]):
+class ResponseModel(BaseModel, Generic[T]):
     status: str
     data: Optional[T] = None
     message: Optional[str] = None
     errors: Optional[Any] = None
+    meta: Optional[dict[str, Any]] = None
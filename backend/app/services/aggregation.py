@@ -0,0 +1,565 @@
+"""Generic aggregation of lead metrics by dimension and time grain.
+
+Every dashboard aggregation is built and executed here so there is a single
+query shape to optimise and a single place that is timed.
+"""
+import calendar
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Literal, Sequence
+
+from sqlalchemy import BigInteger, Date, Float, Integer, and_, case, cast, func, literal, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import AGGREGATION_DURATION, AGGREGATION_ROWS
+from app.db.dialect import dialect_name
+from app.db.models import Category, LeadMetric, Source, Week, WeekCategoryRollup, WeekSourceRollup, WeekCategoryView, WeekSourceView
+from app.services.matviews import matviews_enabled
+from app.services.pricing import spend_expression
+
+
+logger = logging.getLogger(__name__)
+
+Dimension = Literal["category", "source"]
+Grain = Literal["week", "month", "quarter", "year", "total"]
+
+DIMENSION_COLUMNS: dict[str, str] = {
+    "category": "category_id",
+    "source": "source_id",
+}
+
+DIMENSION_TABLES = {
+    "category": Category,
+    "source": Source,
+}
+
+WEEKLY_ROLLUPS = {
+    "category": WeekCategoryRollup,
+    "source": WeekSourceRollup,
+}
+
+WEEKLY_MATVIEWS = {
+    "category": WeekCategoryView,
+    "source": WeekSourceView,
+}
+
+# Calendar grains: weeks are split by day across their buckets
+GRAIN_MONTHS = {
+    "month": 1,
+    "quarter": 3,
+    "year": 12,
+}
+
+
+@dataclass(frozen=True)
+class Metric:
+    """An aggregate over the base relation (lead_metrics, a rollup table or view).
+
+    `pricing` metrics read the source pricing type, so lead_metrics is joined with sources.
+    """
+    name: str
+    expression: Callable[[Any], Any]
+    pricing: bool = False
+
+
+METRICS: dict[str, Metric] = {}
+
+
+def register_metric(metric: Metric) -> Metric:
+    METRICS[metric.name] = metric
+    return metric
+
+
+def _spend(base):
+    # Rollups and views store the spend; raw metrics derive it from their source's pricing
+    if base is LeadMetric:
+        return spend_expression(LeadMetric.amount, LeadMetric.leads_count, Source.pricing_type)
+    return base.spend
+
+
+register_metric(Metric("amount", lambda base: func.sum(base.amount)))
+register_metric(Metric("leads_count", lambda base: func.sum(base.leads_count)))
+register_metric(Metric("spend", lambda base: func.sum(_spend(base)), pricing=True))
+register_metric(Metric(
+    "lead_cost",
+    lambda base: cast(func.sum(_spend(base)), Float) / func.nullif(func.sum(base.leads_count), 0),
+    pricing=True
+))
+
+
+@dataclass(frozen=True)
+class AggregationQuery:
+    dimensions: tuple[Dimension, ...]
+    grain: Grain = "week"
+    metrics: tuple[str, ...] = ("amount", "leads_count", "spend", "lead_cost")
+    category_ids: tuple[int, ...] | None = None
+    source_ids: tuple[int, ...] | None = None
+    from_date: date | None = None
+    to_date: date | None = None
+
+    @property
+    def name(self) -> str:
+        return f"{'_'.join(self.dimensions) or 'all'}.{self.grain}"
+
+
+async def run_aggregation(session: AsyncSession, name: str, stmt):
+    """Execute an aggregate statement, recording its latency under `name`."""
+    started = time.perf_counter()
+    result = await session.execute(stmt)
+    rows = result.all()
+    elapsed = time.perf_counter() - started
+
+    AGGREGATION_DURATION.observe(elapsed, query=name)
+    AGGREGATION_ROWS.observe(len(rows), query=name)
+
+    if elapsed * 1000 >= settings.AGGREGATION_SLOW_MS:
+        logger.warning("Slow aggregation %s: %.1f ms, %d rows", name, elapsed * 1000, len(rows))
+    else:
+        logger.debug("Aggregation %s: %.1f ms, %d rows", name, elapsed * 1000, len(rows))
+    return rows
+
+
+def _base_relation(session: AsyncSession, query: AggregationQuery):
+    """The narrowest table or view that can answer the query."""
+    used = set(query.dimensions)
+    if query.category_ids is not None:
+        used.add("category")
+    if query.source_ids is not None:
+        used.add("source")
+
+    if len(used) == 1 and matviews_enabled(session):
+        return WEEKLY_MATVIEWS[used.pop()]
+    if len(used) == 1 and settings.DASHBOARD_AGGREGATE_SOURCE != "live":
+        return WEEKLY_ROLLUPS[used.pop()]
+    return LeadMetric
+
+
+def _bucket_start(session: AsyncSession, grain: Grain, column):
+    """First day of the month, quarter or year containing `column`."""
+    if dialect_name(session) == "postgresql":
+        return cast(func.date_trunc(grain, column), Date)
+
+    # SQLite: first day of the month or year, shifted back to the quarter start
+    if grain == "year":
+        return func.date(column, "start of year")
+    month_start = func.date(column, "start of month")
+    if grain == "month":
+        return month_start
+    months_back = (cast(func.strftime("%m", column), Float) - 1) % 3
+    return func.date(month_start, func.printf("-%d months", months_back))
+
+
+def _days_between(session: AsyncSession, start, end):
+    """Whole days from `start` to `end`, as an integer."""
+    if dialect_name(session) == "postgresql":
+        return end - start
+    return cast(func.julianday(end) - func.julianday(start), Integer)
+
+
+def bucket_start(day: date, grain: Grain) -> date:
+    month = day.month - (day.month - 1) % GRAIN_MONTHS[grain]
+    return date(day.year, month, 1)
+
+
+def bucket_end(start: date, grain: Grain) -> date:
+    months = GRAIN_MONTHS[grain]
+    month_index = start.month - 1 + months - 1
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _week_buckets(session: AsyncSession, query: AggregationQuery):
+    """(week_id, period_start, days_before, days_through, days) for every week in range.
+
+    A week crossing a bucket boundary yields one row per side. A bucket gets the
+    week's days after `days_before` up to `days_through`, out of `days`. Weeks
+    are assumed shorter than a month, so they touch at most two buckets.
+    """
+    first_bucket = _bucket_start(session, query.grain, Week.start_date)
+    last_bucket = _bucket_start(session, query.grain, Week.end_date)
+    days = _days_between(session, Week.start_date, Week.end_date) + 1
+    head_days = _days_between(session, Week.start_date, last_bucket)
+
+    conditions = []
+    if query.from_date:
+        conditions.append(Week.start_date >= query.from_date)
+    if query.to_date:
+        conditions.append(Week.end_date <= query.to_date)
+
+    head = select(
+        Week.id.label("week_id"),
+        first_bucket.label("period_start"),
+        literal(0).label("days_before"),
+        case((first_bucket == last_bucket, days), else_=head_days).label("days_through"),
+        days.label("days")
+    ).where(*conditions)
+    tail = select(Week.id, last_bucket, head_days, days, days).where(first_bucket != last_bucket, *conditions)
+    return union_all(head, tail).subquery("week_buckets")
+
+
+def _split_relation(session: AsyncSession, query: AggregationQuery, base):
+    """Weekly totals per entity, with amounts, leads and spend spread over calendar buckets by day.
+
+    Each total is split in whole units: a bucket gets floor(x * days_through / days)
+    minus floor(x * days_before / days), so the buckets of a week add up to its
+    total exactly and lead cost is computed from the same integers. Totals are
+    taken per entity and week first, so the rollup tables and lead_metrics split
+    the same numbers.
+    """
+    dimension_columns = [getattr(base, DIMENSION_COLUMNS[dimension]) for dimension in query.dimensions]
+    weekly = select(
+        *dimension_columns,
+        base.week_id,
+        cast(func.sum(base.amount), BigInteger).label("amount"),
+        cast(func.sum(base.leads_count), BigInteger).label("leads_count"),
+        cast(func.sum(_spend(base)), BigInteger).label("spend")
+    ).select_from(base)
+    if base is LeadMetric:
+        weekly = weekly.join(Source, Source.id == LeadMetric.source_id)
+    conditions = _entity_conditions(query, base)
+    if conditions:
+        weekly = weekly.where(*conditions)
+    weekly = weekly.group_by(*dimension_columns, base.week_id).subquery("weekly")
+
+    buckets = _week_buckets(session, query)
+
+    def share(column):
+        return column * buckets.c.days_through // buckets.c.days - column * buckets.c.days_before // buckets.c.days
+
+    return (
+        select(
+            *(weekly.c[DIMENSION_COLUMNS[dimension]] for dimension in query.dimensions),
+            buckets.c.period_start,
+            share(weekly.c.amount).label("amount"),
+            share(weekly.c.leads_count).label("leads_count"),
+            share(weekly.c.spend).label("spend")
+        )
+        .select_from(weekly)
+        .join(buckets, buckets.c.week_id == weekly.c.week_id)
+        .subquery("split")
+    )
+
+
+def _entity_conditions(query: AggregationQuery, base) -> list:
+    conditions = []
+    if query.category_ids is not None:
+        conditions.append(base.category_id.in_(query.category_ids))
+    if query.source_ids is not None:
+        conditions.append(base.source_id.in_(query.source_ids))
+    return conditions
+
+
+def build_statement(session: AsyncSession, query: AggregationQuery, part: str | None = None):
+    """SELECT ... GROUP BY dimensions, period for `query`.
+
+    With `part`, the statement is shaped for a UNION ALL with other single-dimension
+    queries: a literal `part` column is added and the dimension is labelled `entity_id`.
+    """
+    base = _base_relation(session, query)
+    split = query.grain in GRAIN_MONTHS
+    relation = _split_relation(session, query, base).c if split else base
+
+    columns = []
+    group_by = []
+    if part is not None:
+        columns.append(literal(part).label("part"))
+    for dimension in query.dimensions:
+        column = getattr(relation, DIMENSION_COLUMNS[dimension])
+        columns.append(column.label("entity_id" if part is not None else DIMENSION_COLUMNS[dimension]))
+        group_by.append(column)
+
+    if query.grain == "week":
+        columns += [Week.id.label("week_id"), Week.start_date.label("period_start"), Week.end_date.label("period_end")]
+        # Start date first and the id as a tiebreaker: week ids need not follow the calendar
+        group_by += [Week.start_date, Week.id, Week.end_date]
+    elif split:
+        columns.append(relation.period_start)
+        group_by.append(relation.period_start)
+
+    columns += [METRICS[name].expression(relation).label(name) for name in query.metrics]
+
+    if split:
+        # Entity and date filters were applied inside the split relation
+        stmt = select(*columns)
+    else:
+        conditions = _entity_conditions(query, base)
+        if query.from_date:
+            conditions.append(Week.start_date >= query.from_date)
+        if query.to_date:
+            conditions.append(Week.end_date <= query.to_date)
+
+        stmt = select(*columns).select_from(base).join(Week, Week.id == base.week_id)
+        if base is LeadMetric and any(METRICS[name].pricing for name in query.metrics):
+            stmt = stmt.join(Source, Source.id == LeadMetric.source_id)
+        if conditions:
+            stmt = stmt.where(*conditions)
+
+    if group_by:
+        stmt = stmt.group_by(*group_by)
+        if part is None:
+            # Period first: per-entity series come out in time order after grouping
+            stmt = stmt.order_by(*group_by[len(query.dimensions):], *group_by[:len(query.dimensions)])
+    return stmt
+
+
+def _fill_buckets(results: list[dict], query: AggregationQuery, dimension_columns: list[str]) -> list[dict]:
+    """Add period ends, and zero rows for buckets an entity has no data in.
+
+    Buckets span the requested date range, or the data's own range when it is open.
+    Every entity seen in the results, or named in the filters, gets the full series.
+    """
+    for item in results:
+        start = item["period_start"]
+        if isinstance(start, str):
+            start = item["period_start"] = date.fromisoformat(start)
+        item["period_end"] = bucket_end(start, query.grain)
+        for name in ("amount", "leads_count", "spend"):
+            if item.get(name) is not None:
+                item[name] = int(item[name])
+
+    starts = [item["period_start"] for item in results]
+    first = bucket_start(query.from_date, query.grain) if query.from_date else min(starts, default=None)
+    last = bucket_start(query.to_date, query.grain) if query.to_date else max(starts, default=None)
+    if first is None or last is None:
+        return results
+
+    entities = {tuple(item[column] for column in dimension_columns) for item in results}
+    if len(query.dimensions) == 1:
+        requested = {"category": query.category_ids, "source": query.source_ids}[query.dimensions[0]]
+        entities.update((entity_id,) for entity_id in requested or ())
+    elif not query.dimensions:
+        entities.add(())
+
+    present = {
+        (tuple(item[column] for column in dimension_columns), item["period_start"])
+        for item in results
+    }
+    zeros = {name: 0 for name in query.metrics if name != "lead_cost"}
+    if "lead_cost" in query.metrics:
+        zeros["lead_cost"] = None
+
+    start = first
+    while start <= last:
+        for entity in entities:
+            if (entity, start) not in present:
+                results.append({
+                    **dict(zip(dimension_columns, entity)),
+                    "period_start": start,
+                    "period_end": bucket_end(start, query.grain),
+                    **zeros
+                })
+        start = bucket_end(start, query.grain) + timedelta(days=1)
+
+    results.sort(key=lambda item: (item["period_start"], *(item[column] for column in dimension_columns)))
+    return results
+
+
+def _finish(results: list[dict], query: AggregationQuery, dimension_columns: list[str]) -> list[dict]:
+    if query.grain in GRAIN_MONTHS:
+        return _fill_buckets(results, query, dimension_columns)
+    return results
+
+
+async def aggregate(session: AsyncSession, query: AggregationQuery) -> list[dict]:
+    """Run `query` and return one dict per (dimension values, period) group."""
+    rows = await run_aggregation(session, query.name, build_statement(session, query))
+    return _finish(
+        [row._asdict() for row in rows],
+        query,
+        [DIMENSION_COLUMNS[dimension] for dimension in query.dimensions]
+    )
+
+
+async def aggregate_parts(session: AsyncSession, parts: dict[str, AggregationQuery]) -> dict[str, list[dict]]:
+    """Run several single-dimension queries as one UNION ALL round-trip.
+
+    Results are keyed like `parts`; rows use the usual dimension column names.
+    """
+    results: dict[str, list[dict]] = {name: [] for name in parts}
+    if not parts:
+        return results
+
+    stmt = union_all(*(build_statement(session, query, part=name) for name, query in parts.items()))
+    if all(query.grain == "week" for query in parts.values()):
+        stmt = stmt.order_by("period_start", "week_id", "part", "entity_id")
+    elif all(query.grain != "total" for query in parts.values()):
+        stmt = stmt.order_by("period_start", "part", "entity_id")
+    name = "+".join(query.name for query in parts.values())
+    for row in await run_aggregation(session, name, stmt):
+        item = row._asdict()
+        part = item.pop("part")
+        item[DIMENSION_COLUMNS[parts[part].dimensions[0]]] = item.pop("entity_id")
+        results[part].append(item)
+
+    for part, query in parts.items():
+        _finish(results[part], query, [DIMENSION_COLUMNS[query.dimensions[0]]])
+    return results
+
+
+def group_by_dimension(rows: Sequence[dict], dimension: Dimension) -> dict[int, list[dict]]:
+    grouped: dict[int, list[dict]] = {}
+    for row in rows:
+        grouped.setdefault(row[DIMENSION_COLUMNS[dimension]], []).append(row)
+    return grouped
+
+
+@dataclass(frozen=True)
+class SeriesQuery:
+    """Derived weekly series of one metric per category or source."""
+    dimension: Dimension
+    metric: str = "leads_count"
+    window: int = 4
+    ids: tuple[int, ...] | None = None
+    from_date: date | None = None
+    to_date: date | None = None
+
+    @property
+    def name(self) -> str:
+        return f"analytics.{self.dimension}.{self.metric}"
+
+
+def build_series_statement(session: AsyncSession, query: SeriesQuery):
+    """Week-over-week change, moving average and running total of one metric.
+
+    Every entity gets a row for every week in range (zero when it has no data),
+    so LAG compares with the calendar week before and the moving window counts
+    weeks, not rows. The first weeks of a series average over fewer weeks.
+    Lead cost windows divide summed spend by summed leads instead of averaging ratios.
+    """
+    column = DIMENSION_COLUMNS[query.dimension]
+    entity = DIMENSION_TABLES[query.dimension]
+    ids = {f"{query.dimension}_ids": query.ids}
+
+    totals = build_statement(session, AggregationQuery(
+        dimensions=(query.dimension,),
+        metrics=("amount", "leads_count", "spend"),
+        from_date=query.from_date,
+        to_date=query.to_date,
+        **ids
+    )).order_by(None).subquery("totals")
+
+    grid = (
+        select(
+            entity.id.label(column),
+            Week.id.label("week_id"),
+            Week.start_date.label("period_start"),
+            Week.end_date.label("period_end")
+        )
+        .select_from(entity)
+        .join(Week, true())
+    )
+    if query.ids is not None:
+        grid = grid.where(entity.id.in_(query.ids))
+    if query.from_date:
+        grid = grid.where(Week.start_date >= query.from_date)
+    if query.to_date:
+        grid = grid.where(Week.end_date <= query.to_date)
+    grid = grid.subquery("grid")
+
+    amount, leads, spend = (
+        func.coalesce(totals.c[name], 0) for name in ("amount", "leads_count", "spend")
+    )
+    series = {"partition_by": grid.c[column], "order_by": (grid.c.period_start, grid.c.week_id)}
+    moving = {**series, "rows": (-(query.window - 1), 0)}
+    running = {**series, "rows": (None, 0)}
+
+    if query.metric == "lead_cost":
+        value = cast(spend, Float) / func.nullif(leads, 0)
+        moving_avg = cast(func.sum(spend).over(**moving), Float) / func.nullif(func.sum(leads).over(**moving), 0)
+        cumulative = cast(func.sum(spend).over(**running), Float) / func.nullif(func.sum(leads).over(**running), 0)
+    else:
+        value = {"amount": amount, "leads_count": leads, "spend": spend}[query.metric]
+        moving_avg = func.avg(value).over(**moving)
+        cumulative = func.sum(value).over(**running)
+
+    return (
+        select(
+            grid.c[column],
+            grid.c.week_id,
+            grid.c.period_start,
+            grid.c.period_end,
+            value.label("value"),
+            (value - func.lag(value).over(**series)).label("change"),
+            moving_avg.label("moving_avg"),
+            cumulative.label("cumulative")
+        )
+        .select_from(grid.outerjoin(
+            totals,
+            and_(totals.c[column] == grid.c[column], totals.c.week_id == grid.c.week_id)
+        ))
+        .order_by(grid.c[column], grid.c.period_start, grid.c.week_id)
+    )
+
+
+async def series(session: AsyncSession, query: SeriesQuery) -> list[dict]:
+    rows = await run_aggregation(session, query.name, build_series_statement(session, query))
+    return [row._asdict() for row in rows]
+
+
+@dataclass(frozen=True)
+class RankingQuery:
+    """Top `limit` categories, sources or category x source pairs by one metric.
+
+    With `per`, pairs are ranked within each category (or source) instead of overall.
+    """
+    dimensions: tuple[Dimension, ...]
+    metric: str = "leads_count"
+    descending: bool = True
+    limit: int = 10
+    per: Dimension | None = None
+    from_date: date | None = None
+    to_date: date | None = None
+
+    @property
+    def name(self) -> str:
+        per = f".per_{self.per}" if self.per else ""
+        return f"ranking.{'_'.join(self.dimensions)}{per}.{self.metric}"
+
+
+def build_ranking_statement(session: AsyncSession, query: RankingQuery):
+    """Totals per entity over the date range, numbered by the metric and cut at `limit`.
+
+    Groups whose metric is NULL (lead cost without leads) are not ranked. Ties are
+    broken by id so the top N is stable. Overall rankings sort once and LIMIT;
+    per-entity rankings number rows with ROW_NUMBER() OVER (PARTITION BY ...).
+    """
+    totals = build_statement(session, AggregationQuery(
+        dimensions=query.dimensions,
+        grain="total",
+        from_date=query.from_date,
+        to_date=query.to_date
+    )).order_by(None).subquery("totals")
+
+    value = totals.c[query.metric]
+    ids = [totals.c[DIMENSION_COLUMNS[dimension]] for dimension in query.dimensions]
+    order = [value.desc() if query.descending else value.asc(), *ids]
+    partition = totals.c[DIMENSION_COLUMNS[query.per]] if query.per else None
+
+    columns = []
+    stmt_from = totals
+    for dimension, column in zip(query.dimensions, ids):
+        entity = DIMENSION_TABLES[dimension]
+        columns += [column, entity.name.label(f"{dimension}_name")]
+        stmt_from = stmt_from.join(entity, entity.id == column)
+    columns += [totals.c[name] for name in ("amount", "leads_count", "spend", "lead_cost")]
+    columns.append(func.row_number().over(partition_by=partition, order_by=order).label("rank"))
+
+    ranked = select(*columns).select_from(stmt_from).where(value.is_not(None))
+    if partition is None:
+        return ranked.order_by(*order).limit(query.limit)
+
+    ranked = ranked.subquery("ranked")
+    return (
+        select(ranked)
+        .where(ranked.c.rank <= query.limit)
+        .order_by(ranked.c[DIMENSION_COLUMNS[query.per]], ranked.c.rank)
+    )
+
+
+async def ranking(session: AsyncSession, query: RankingQuery) -> list[dict]:
+    rows = await run_aggregation(session, query.name, build_ranking_statement(session, query))
+    return [row._asdict() for row in rows]
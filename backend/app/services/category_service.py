@@ -4,11 +4,18 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.db.models import Category
+from app.core.pagination import keyset
+from app.db.models import Category, LeadMetric
+from app.services.rollup_service import retract_metrics
+from app.services.invalidation import entities_created, category_changed
 from app.schemas.category import CategoryCreate, CategoryUpdate
 
-async def get_all_categories(session: AsyncSession) -> Sequence[Category]:
-    result = await session.execute(select(Category))
+async def get_all_categories(
+    session: AsyncSession,
+    after: tuple | None = None,
+    limit: int | None = None
+) -> Sequence[Category]:
+    result = await session.execute(keyset(select(Category), [Category.id], after, limit))
     return result.scalars().all()
 
 
@@ -29,6 +36,7 @@ async def create_category_in_db(session: AsyncSession, category_data: CategoryCr
     new_category = Category(name=category_data.name)
     session.add(new_category)
     await session.commit()
+    await entities_created(session)
     await session.refresh(new_category)
     return new_category, True
 
@@ -55,9 +63,13 @@ async def update_category_in_db(
     session.add(category)
     await session.commit()
     await session.refresh(category)
+    await category_changed(session, category.id)
     return category
 
 
 async def delete_category_in_db(session: AsyncSession, category: Category) -> None:
+    category_id = category.id
+    retracted = await retract_metrics(session, LeadMetric.category_id == category_id)
     await session.delete(category)
-    await session.commit()
\ No newline at end of file
+    await session.commit()
+    await category_changed(session, category_id, {delta.source_id for delta in retracted})
\ No newline at end of file
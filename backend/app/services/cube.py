@@ -0,0 +1,298 @@
+"""In-memory category x source x week cube for dashboard reads without SQL.
+
+lead_metrics holds at most one row per (category, source, week), so the data
+is a dense 3-D array per measure. The cube keeps `amount`, `leads_count` and
+`spend` in NumPy arrays, plus a mask of the cells that have a row (SQL only
+returns groups with data), and answers overview and week/total aggregates as
+sums along its axes. Calendar grains and window series still go to SQL.
+
+The "cube" scheduler job (see app/main.py) loads it; `metrics_changed` patches
+the written cells in place. Like snapshots, the cube is used only while its
+data version is the current one, so writes from other workers or to entities
+it does not know yet make readers fall back to SQL until the next load.
+"""
+import logging
+import time
+from datetime import date
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import AGGREGATION_DURATION, AGGREGATION_ROWS, CUBE_READS
+from app.db.models import Category, LeadMetric, Source, Week
+from app.services.data_version import get_data_version
+from app.services.pricing import spend_expression
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional engine
+    numpy = None
+
+
+logger = logging.getLogger(__name__)
+
+AXES = {"category": 0, "source": 1}
+WEEK_AXIS = 2
+CUBE_METRICS = {"amount", "leads_count", "spend", "lead_cost"}
+CELL_LOOKUP_CHUNK = 5000
+
+
+def cube_enabled() -> bool:
+    return settings.DASHBOARD_CUBE_ENABLED and numpy is not None
+
+
+def _cells():
+    return (
+        select(
+            LeadMetric.category_id,
+            LeadMetric.source_id,
+            LeadMetric.week_id,
+            LeadMetric.amount,
+            LeadMetric.leads_count,
+            spend_expression(LeadMetric.amount, LeadMetric.leads_count, Source.pricing_type)
+        )
+        .join(Source, Source.id == LeadMetric.source_id)
+    )
+
+
+def _positions_of(ids, values):
+    """Positions of `values` in the (not necessarily sorted) `ids` axis."""
+    order = numpy.argsort(ids)
+    return order[numpy.searchsorted(ids, values, sorter=order)]
+
+
+class LeadCube:
+    def __init__(self, version: int, categories: list, sources: list, weeks: list):
+        self.version = version
+        self.category_ids = numpy.array([row[0] for row in categories], dtype=numpy.int64)
+        self.category_names = [row[1] for row in categories]
+        self.source_ids = numpy.array([row[0] for row in sources], dtype=numpy.int64)
+        self.source_names = [row[1] for row in sources]
+        self.week_ids = numpy.array([row[0] for row in weeks], dtype=numpy.int64)
+        self.week_starts = [row[1] for row in weeks]
+        self.week_ends = [row[2] for row in weeks]
+        self._week_starts = numpy.array(self.week_starts, dtype="datetime64[D]")
+        self._week_ends = numpy.array(self.week_ends, dtype="datetime64[D]")
+        self._ids = (self.category_ids, self.source_ids, self.week_ids)
+        self._index = tuple({entity_id: index for index, entity_id in enumerate(ids.tolist())} for ids in self._ids)
+
+        shape = (len(categories), len(sources), len(weeks))
+        self.amount = numpy.zeros(shape, dtype=numpy.int64)
+        self.leads = numpy.zeros(shape, dtype=numpy.int64)
+        self.spend = numpy.zeros(shape, dtype=numpy.int64)
+        self.present = numpy.zeros(shape, dtype=bool)
+
+    @property
+    def cells(self) -> int:
+        return self.present.size
+
+    @classmethod
+    async def load(cls, session: AsyncSession) -> "LeadCube | None":
+        """Read every entity and metric; None when the cube would exceed DASHBOARD_CUBE_MAX_CELLS."""
+        # Read the version first: a write landing mid-load then makes the cube stale, never wrong
+        version = await get_data_version(session)
+        categories = (await session.execute(select(Category.id, Category.name).order_by(Category.id))).all()
+        sources = (await session.execute(select(Source.id, Source.name).order_by(Source.id))).all()
+        # Weeks in calendar order, like the SQL path: ids need not follow the dates
+        weeks = (await session.execute(
+            select(Week.id, Week.start_date, Week.end_date).order_by(Week.start_date, Week.id)
+        )).all()
+
+        cells = len(categories) * len(sources) * len(weeks)
+        if cells > settings.DASHBOARD_CUBE_MAX_CELLS:
+            logger.warning("Lead cube of %d cells exceeds DASHBOARD_CUBE_MAX_CELLS, not loading it", cells)
+            return None
+
+        cube = cls(version, categories, sources, weeks)
+        rows = (await session.execute(_cells())).all()
+        if rows:
+            data = numpy.array(rows, dtype=numpy.int64)
+            index = tuple(_positions_of(ids, data[:, axis]) for axis, ids in enumerate(cube._ids))
+            cube.amount[index] = data[:, 3]
+            cube.leads[index] = data[:, 4]
+            cube.spend[index] = data[:, 5]
+            cube.present[index] = True
+        return cube
+
+    async def apply_changes(self, session: AsyncSession, keys: set[tuple[int, int, int]], version: int) -> bool:
+        """Re-read the changed (category_id, source_id, week_id) cells and move to `version`.
+
+        Returns False, leaving the cube stale, when a key names an entity loaded after it.
+        """
+        positions = {}
+        for key in keys:
+            index = tuple(lookup.get(entity_id) for lookup, entity_id in zip(self._index, key))
+            if None in index:
+                return False
+            positions[key] = index
+
+        values = dict.fromkeys(keys)
+        keys = list(keys)
+        for start in range(0, len(keys), CELL_LOOKUP_CHUNK):
+            result = await session.execute(_cells().where(
+                tuple_(LeadMetric.category_id, LeadMetric.source_id, LeadMetric.week_id)
+                .in_(keys[start:start + CELL_LOOKUP_CHUNK])
+            ))
+            for category_id, source_id, week_id, amount, leads, spend in result.all():
+                values[(category_id, source_id, week_id)] = (amount, leads, spend)
+
+        for key, cell in values.items():
+            index = positions[key]
+            # A key without a row was deleted
+            self.amount[index], self.leads[index], self.spend[index] = cell or (0, 0, 0)
+            self.present[index] = cell is not None
+        self.version = version
+        return True
+
+    def supports(self, query) -> bool:
+        """Whether `query` (an AggregationQuery) can be answered from the cube."""
+        return query.grain in ("week", "total") and set(query.metrics) <= CUBE_METRICS
+
+    def _positions(self, axis: int, ids: tuple[int, ...] | None):
+        """Indices of the requested ids along `axis`, or None for the whole axis."""
+        if ids is None:
+            return None
+        lookup = self._index[axis]
+        return numpy.array(sorted({lookup[entity_id] for entity_id in ids if entity_id in lookup}), dtype=numpy.intp)
+
+    def _week_positions(self, from_date: date | None, to_date: date | None):
+        if from_date is None and to_date is None:
+            return None
+        mask = numpy.ones(len(self.week_starts), dtype=bool)
+        if from_date is not None:
+            mask &= self._week_starts >= numpy.datetime64(from_date, "D")
+        if to_date is not None:
+            mask &= self._week_ends <= numpy.datetime64(to_date, "D")
+        return numpy.flatnonzero(mask)
+
+    def aggregate(self, query) -> list[dict]:
+        """Rows shaped and ordered like `aggregation.aggregate` for week and total grains."""
+        started = time.perf_counter()
+        selection = (
+            self._positions(0, query.category_ids),
+            self._positions(1, query.source_ids),
+            self._week_positions(query.from_date, query.to_date)
+        )
+        measures = [self.amount, self.leads, self.spend, self.present]
+        for axis, positions in enumerate(selection):
+            if positions is not None:
+                measures = [measure.take(positions, axis=axis) for measure in measures]
+
+        # Output axes: period first, then dimensions in query order, as in the SQL ORDER BY
+        kept = ([WEEK_AXIS] if query.grain == "week" else []) + [AXES[dimension] for dimension in query.dimensions]
+        reduced = tuple(axis for axis in range(3) if axis not in kept)
+        remaining = sorted(kept)
+        order = [remaining.index(axis) for axis in kept]
+        amount, leads, spend = (measure.sum(axis=reduced).transpose(order) for measure in measures[:3])
+        present = measures[3].any(axis=reduced).transpose(order)
+
+        if kept:
+            groups = numpy.nonzero(present)
+        elif present:
+            groups = ()
+        else:
+            # No GROUP BY: SQL returns one row, with NULL sums when nothing matched
+            groups = None
+        rows = self._rows(query, selection, groups, amount, leads, spend)
+
+        elapsed = time.perf_counter() - started
+        AGGREGATION_DURATION.observe(elapsed, query=f"{query.name}.cube")
+        AGGREGATION_ROWS.observe(len(rows), query=f"{query.name}.cube")
+        return rows
+
+    def _rows(self, query, selection, groups, amount, leads, spend) -> list[dict]:
+        if groups is None:
+            return [dict.fromkeys(query.metrics)]
+
+        columns = {}
+        axes = ([("week", WEEK_AXIS)] if query.grain == "week" else []) + [
+            (f"{dimension}_id", AXES[dimension]) for dimension in query.dimensions
+        ]
+        for (name, axis), indices in zip(axes, groups):
+            positions = indices if selection[axis] is None else selection[axis][indices]
+            if axis == WEEK_AXIS:
+                columns["week_id"] = self.week_ids[positions].tolist()
+                columns["period_start"] = [self.week_starts[week] for week in positions.tolist()]
+                columns["period_end"] = [self.week_ends[week] for week in positions.tolist()]
+            else:
+                columns[name] = self._ids[axis][positions].tolist()
+
+        columns["amount"] = numpy.atleast_1d(amount[groups]).tolist()
+        columns["leads_count"] = numpy.atleast_1d(leads[groups]).tolist()
+        columns["spend"] = numpy.atleast_1d(spend[groups]).tolist()
+        columns["lead_cost"] = [
+            total_spend / total_leads if total_leads else None
+            for total_spend, total_leads in zip(columns["spend"], columns["leads_count"])
+        ]
+
+        names = [f"{dimension}_id" for dimension in query.dimensions]
+        if query.grain == "week":
+            names += ["week_id", "period_start", "period_end"]
+        names += query.metrics
+        return [dict(zip(names, row)) for row in zip(*(columns[name] for name in names))]
+
+    def overview(self) -> dict:
+        """Per-category and per-source totals in the `_summary_overview` format, unsorted."""
+        summaries = {}
+        for dimension, axis in AXES.items():
+            reduced = tuple(other for other in range(3) if other != axis)
+            present = numpy.flatnonzero(self.present.any(axis=reduced))
+            leads = self.leads.sum(axis=reduced)[present].tolist()
+            amount = self.amount.sum(axis=reduced)[present].tolist()
+            spend = self.spend.sum(axis=reduced)[present].tolist()
+            names = self.category_names if dimension == "category" else self.source_names
+            summaries[dimension] = [
+                {
+                    f"{dimension}_id": entity_id,
+                    f"{dimension}_name": names[index],
+                    "total_leads": total_leads,
+                    "total_amount": float(total_amount),
+                    "total_spend": float(total_spend)
+                }
+                for entity_id, index, total_leads, total_amount, total_spend in zip(
+                    self._ids[axis][present].tolist(), present.tolist(), leads, amount, spend
+                )
+            ]
+        return {"by_category": summaries["category"], "by_source": summaries["source"], "totals": None}
+
+
+_published: LeadCube | None = None
+
+
+def publish_cube(cube: LeadCube) -> None:
+    global _published
+    if _published is None or cube.version >= _published.version:
+        _published = cube
+
+
+async def current_cube(session: AsyncSession) -> LeadCube | None:
+    """The loaded cube, if it is at the session's current data version."""
+    cube = _published
+    if cube is None or not cube_enabled():
+        return None
+    if cube.version != await get_data_version(session):
+        CUBE_READS.inc(result="stale")
+        return None
+    CUBE_READS.inc(result="hit")
+    return cube
+
+
+async def refresh_cube(sessionmaker: async_sessionmaker) -> None:
+    async with sessionmaker() as session:
+        cube = _published
+        if cube is not None and cube.version == await get_data_version(session):
+            return
+        started = time.perf_counter()
+        cube = await LeadCube.load(session)
+    if cube is not None:
+        publish_cube(cube)
+        logger.info("Loaded lead cube of %d cells in %.1f ms", cube.cells, (time.perf_counter() - started) * 1000)
+
+
+async def cube_metrics_changed(session: AsyncSession, keys: set[tuple[int, int, int]], version: int) -> None:
+    """Patch the cells a write changed when the cube was current just before it."""
+    cube = _published
+    if cube is None or not cube_enabled() or cube.version != version - 1:
+        return
+    await cube.apply_changes(session, keys, version)
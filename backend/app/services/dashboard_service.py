@@ -1,224 +1,694 @@
-from collections import defaultdict
-from datetime import date
+from datetime import date, datetime, timezone
+from types import MappingProxyType
+from typing import AsyncIterator
 
-from sqlalchemy import func, select, and_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import LeadMetric, Category, Source, Week
-from app.schemas.lead_stats import LeadStatsSummary, WeeklyStats
+from app.core.cache import cached, dashboard_cache
+from app.core.config import settings
+from app.core.pagination import Page, keyset, paginate
+from app.db.dialect import dialect_name
+from app.services.data_version import get_data_version
+from app.db.models import LeadMetric, Category, Source, Week, CategoryRollup, SourceRollup, CategoryView, SourceView
+from app.schemas.lead_stats import LeadStatsBatch, LeadStatsSummary, WeeklyStats
+from app.services.aggregation import (
+    AggregationQuery, Grain, RankingQuery, SeriesQuery, aggregate, aggregate_parts, group_by_dimension, ranking,
+    run_aggregation, series
+)
+from app.services.cube import current_cube
+from app.services.invalidation import OVERVIEW, AGGREGATES, category_tag, source_tag
+from app.services.matviews import matviews_enabled
+from app.services.pricing import spend_expression
+from app.services.snapshots import DashboardSnapshot, current_snapshot, publish_snapshot
+
+
+GROUPING_SETS_DIALECTS = {"postgresql"}
+
+def _use_rollups() -> bool:
+    return settings.DASHBOARD_AGGREGATE_SOURCE != "live"
+
+
+@cached(dashboard_cache, tags=lambda args: {OVERVIEW})
+async def get_summary_stats_overview(session: AsyncSession, include_totals: bool = False):
+    snapshot = await current_snapshot(session)
+    if snapshot is not None:
+        return snapshot.overview(include_totals)
+
+    overview = await _summary_overview(session)
+    if not include_totals:
+        overview["totals"] = None
+    return overview
+
+
+async def _summary_overview(session: AsyncSession) -> dict:
+    """Per-category and per-source totals sorted by name, with grand totals."""
+    cube = await current_cube(session)
+    if cube is not None:
+        overview = cube.overview()
+    elif matviews_enabled(session):
+        overview = await _summary_overview_rollups(
+            session, CategoryView, SourceView, "overview.category_matview", "overview.source_matview"
+        )
+    elif _use_rollups():
+        overview = await _summary_overview_rollups(session)
+    elif _supports_grouping_sets(session):
+        overview = await _summary_overview_grouping_sets(session)
+    else:
+        overview = await _summary_overview_separate_scans(session)
+
+    overview["by_category"].sort(key=lambda item: item["category_name"])
+    overview["by_source"].sort(key=lambda item: item["source_name"])
+
+    if overview["totals"] is None:
+        overview["totals"] = {
+            "total_leads": sum(item["total_leads"] for item in overview["by_category"]),
+            "total_amount": sum(item["total_amount"] for item in overview["by_category"]),
+            "total_spend": sum(item["total_spend"] for item in overview["by_category"])
+        }
+
+    for item in (*overview["by_category"], *overview["by_source"], overview["totals"]):
+        # Weighted by leads, like the per-week series
+        leads = item["total_leads"]
+        item["lead_cost"] = round(item["total_spend"] / leads, 2) if leads else None
+
+    return overview
+
+
+def _lead_spend():
+    return spend_expression(LeadMetric.amount, LeadMetric.leads_count, Source.pricing_type)
+
+
+def _supports_grouping_sets(session: AsyncSession) -> bool:
+    return dialect_name(session) in GROUPING_SETS_DIALECTS
 
 
-async def get_summary_stats_overview(session: AsyncSession):
-    category_summary_result = await session.execute(
+async def _summary_overview_grouping_sets(session: AsyncSession):
+    """One scan of lead_metrics: per-category, per-source and grand total rows."""
+    stmt = (
+        select(
+            LeadMetric.category_id,
+            Category.name.label("category_name"),
+            LeadMetric.source_id,
+            Source.name.label("source_name"),
+            func.grouping(LeadMetric.category_id).label("category_grouped"),
+            func.grouping(LeadMetric.source_id).label("source_grouped"),
+            func.sum(LeadMetric.leads_count).label("total_leads"),
+            func.sum(LeadMetric.amount).label("total_amount"),
+            func.sum(_lead_spend()).label("total_spend")
+        )
+        .join(Category, Category.id == LeadMetric.category_id)
+        .join(Source, Source.id == LeadMetric.source_id)
+        .group_by(
+            func.grouping_sets(
+                tuple_(LeadMetric.category_id, Category.name),
+                tuple_(LeadMetric.source_id, Source.name),
+                tuple_()
+            )
+        )
+    )
+    rows = await run_aggregation(session, "overview.grouping_sets", stmt)
+
+    category_summary = []
+    source_summary = []
+    totals = None
+
+    for row in rows:
+        if not row.category_grouped:
+            category_summary.append({
+                "category_id": row.category_id,
+                "category_name": row.category_name,
+                "total_leads": row.total_leads,
+                "total_amount": float(row.total_amount),
+                "total_spend": float(row.total_spend)
+            })
+        elif not row.source_grouped:
+            source_summary.append({
+                "source_id": row.source_id,
+                "source_name": row.source_name,
+                "total_leads": row.total_leads,
+                "total_amount": float(row.total_amount),
+                "total_spend": float(row.total_spend)
+            })
+        else:
+            totals = {
+                "total_leads": row.total_leads or 0,
+                "total_amount": float(row.total_amount or 0),
+                "total_spend": float(row.total_spend or 0)
+            }
+
+    return {
+        "by_category": category_summary,
+        "by_source": source_summary,
+        "totals": totals
+    }
+
+
+async def _summary_overview_rollups(
+    session: AsyncSession,
+    category_rollup=CategoryRollup,
+    source_rollup=SourceRollup,
+    category_query: str = "overview.category_rollup",
+    source_query: str = "overview.source_rollup"
+):
+    """Read the all-time per-category and per-source rollups (tables or views): one row per entity."""
+    category_rows = await run_aggregation(
+        session,
+        category_query,
+        select(
+            category_rollup.category_id,
+            Category.name,
+            category_rollup.leads_count,
+            category_rollup.amount,
+            category_rollup.spend
+        )
+        .join(Category, Category.id == category_rollup.category_id)
+    )
+    source_rows = await run_aggregation(
+        session,
+        source_query,
+        select(source_rollup.source_id, Source.name, source_rollup.leads_count, source_rollup.amount, source_rollup.spend)
+        .join(Source, Source.id == source_rollup.source_id)
+    )
+
+    return {
+        "by_category": [
+            {
+                "category_id": category_id,
+                "category_name": name,
+                "total_leads": leads,
+                "total_amount": float(amount),
+                "total_spend": float(spend)
+            }
+            for category_id, name, leads, amount, spend in category_rows
+        ],
+        "by_source": [
+            {
+                "source_id": source_id,
+                "source_name": name,
+                "total_leads": leads,
+                "total_amount": float(amount),
+                "total_spend": float(spend)
+            }
+            for source_id, name, leads, amount, spend in source_rows
+        ],
+        "totals": None
+    }
+
+
+async def _summary_overview_separate_scans(session: AsyncSession):
+    """Fallback for backends without GROUPING SETS (e.g. SQLite)."""
+    category_summary_rows = await run_aggregation(
+        session,
+        "overview.category",
         select(
             LeadMetric.category_id,
             Category.name,
             func.sum(LeadMetric.leads_count).label("total_leads"),
-            func.sum(LeadMetric.amount).label("total_amount")
+            func.sum(LeadMetric.amount).label("total_amount"),
+            func.sum(_lead_spend()).label("total_spend")
         )
         .join(Category, Category.id == LeadMetric.category_id)
+        .join(Source, Source.id == LeadMetric.source_id)
         .group_by(LeadMetric.category_id, Category.name)
-        .order_by(Category.name)
     )
     category_summary = [
         {
             "category_id": row.category_id,
             "category_name": row.name,
             "total_leads": row.total_leads,
-            "total_amount": float(row.total_amount)
+            "total_amount": float(row.total_amount),
+            "total_spend": float(row.total_spend)
         }
-        for row in category_summary_result.all()
+        for row in category_summary_rows
     ]
 
-    source_summary_result = await session.execute(
+    source_summary_rows = await run_aggregation(
+        session,
+        "overview.source",
         select(
             LeadMetric.source_id,
             Source.name,
             func.sum(LeadMetric.leads_count).label("total_leads"),
-            func.sum(LeadMetric.amount).label("total_amount")
+            func.sum(LeadMetric.amount).label("total_amount"),
+            func.sum(_lead_spend()).label("total_spend")
         )
         .join(Source, Source.id == LeadMetric.source_id)
         .group_by(LeadMetric.source_id, Source.name)
-        .order_by(Source.name)
     )
     source_summary = [
         {
             "source_id": row.source_id,
             "source_name": row.name,
             "total_leads": row.total_leads,
-            "total_amount": float(row.total_amount)
+            "total_amount": float(row.total_amount),
+            "total_spend": float(row.total_spend)
         }
-        for row in source_summary_result.all()
+        for row in source_summary_rows
     ]
 
     return {
         "by_category": category_summary,
-        "by_source": source_summary
+        "by_source": source_summary,
+        "totals": None
     }
 
 
-def format_date(date_obj):
-    return date_obj.strftime('%d.%m.%Y')
+async def _aggregate(session: AsyncSession, query: AggregationQuery) -> list[dict]:
+    """`aggregate`, answered from the in-memory cube when it is current and covers the query."""
+    cube = await current_cube(session)
+    if cube is not None and cube.supports(query):
+        return cube.aggregate(query)
+    return await aggregate(session, query)
 
 
-async def get_stats_by_category(
-    session: AsyncSession,
-    category_id: int,
-    from_date: date | None = None,
-    to_date: date | None = None
-) -> LeadStatsSummary:
+async def _aggregate_parts(session: AsyncSession, parts: dict[str, AggregationQuery]) -> dict[str, list[dict]]:
+    cube = await current_cube(session)
+    if cube is None or not all(cube.supports(query) for query in parts.values()):
+        return await aggregate_parts(session, parts)
 
-    conditions = [LeadMetric.category_id == category_id]
+    results = {}
+    for name, query in parts.items():
+        rows = results[name] = cube.aggregate(query)
+        if query.grain != "total":
+            # Same order as the UNION ALL: by period, then entity
+            column = f"{query.dimensions[0]}_id"
+            rows.sort(key=lambda row: (row["period_start"], row.get("week_id", 0), row[column]))
+    return results
 
-    if from_date:
-        conditions.append(Week.start_date >= from_date)
-    if to_date:
-        conditions.append(Week.end_date <= to_date)
 
-    stmt = (
-        select(
-            Week.id,
-            Week.start_date,
-            Week.end_date,
-            func.sum(LeadMetric.amount).label("amount"),
-            func.sum(LeadMetric.leads_count).label("leads_count")
-        )
-        .join(Week, LeadMetric.week_id == Week.id)
-        .where(and_(*conditions))
-        .group_by(Week.id, Week.start_date, Week.end_date)
-        .order_by(Week.start_date)
-    )
+def _round_lead_cost(rows: list[dict]) -> list[dict]:
+    """Round lead_cost to 2 decimals in place, as every dashboard endpoint reports it."""
+    for row in rows:
+        if row.get("lead_cost") is not None:
+            row["lead_cost"] = round(row["lead_cost"], 2)
+    return rows
+
+
+def format_date(date_obj):
+    return date_obj.strftime('%d.%m.%Y')
 
-    result = await session.execute(stmt)
-    rows = result.all()
 
+def _summarize(rows: list[dict], category_id: int | None = None, source_id: int | None = None) -> LeadStatsSummary:
     weekly_stats = [
         WeeklyStats(
-            id=week_id,
+            id=row.get("week_id"),
             lead_metric_id=None,
-            source_id=None,
+            source_id=source_id,
             category_id=category_id,
-            start_date=format_date(start),
-            end_date=format_date(end),
-            amount=amount or 0,
-            leads_count=leads or 0,
-            lead_cost=round((amount or 0) / leads, 2) if leads else None
+            start_date=format_date(row["period_start"]),
+            end_date=format_date(row["period_end"]),
+            amount=row["amount"] or 0,
+            leads_count=row["leads_count"] or 0,
+            spend=row["spend"] or 0,
+            lead_cost=round(row["lead_cost"], 2) if row["lead_cost"] is not None else None
         )
-        for week_id, start, end, amount, leads in rows
+        for row in rows
     ]
 
     total_amount = sum(ws.amount for ws in weekly_stats)
     total_leads = sum(ws.leads_count for ws in weekly_stats)
-    lead_cost = round(total_amount / total_leads, 2) if total_leads > 0 else None
+    total_spend = sum(ws.spend for ws in weekly_stats)
+    # Weighted by leads: the SQL spend already applies each source's pricing rule
+    lead_cost = round(total_spend / total_leads, 2) if total_leads > 0 else None
 
     return LeadStatsSummary(
         total_leads=total_leads,
         total_amount=total_amount,
+        total_spend=total_spend,
         lead_cost=lead_cost,
         weekly_stats=weekly_stats
     )
 
+
+@cached(
+    dashboard_cache,
+    tags=lambda args: {"category", category_tag(args["category_id"])},
+    window=lambda args: (args["from_date"], args["to_date"])
+)
+async def get_stats_by_category(
+    session: AsyncSession,
+    category_id: int,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    grain: Grain = "week"
+) -> LeadStatsSummary:
+    if from_date is None and to_date is None and grain == "week":
+        snapshot = await current_snapshot(session)
+        if snapshot is not None and category_id in snapshot.categories:
+            return snapshot.categories[category_id]
+
+    rows = await _aggregate(session, AggregationQuery(
+        dimensions=("category",),
+        grain=grain,
+        category_ids=(category_id,),
+        from_date=from_date,
+        to_date=to_date
+    ))
+    return _summarize(rows, category_id=category_id)
+
+
+@cached(
+    dashboard_cache,
+    tags=lambda args: {"source", source_tag(args["source_id"])},
+    window=lambda args: (args["from_date"], args["to_date"])
+)
 async def get_stats_by_source(
     session: AsyncSession,
     source_id: int,
     from_date: date | None = None,
-    to_date: date | None = None
+    to_date: date | None = None,
+    grain: Grain = "week"
 ) -> LeadStatsSummary:
+    if from_date is None and to_date is None and grain == "week":
+        snapshot = await current_snapshot(session)
+        if snapshot is not None and source_id in snapshot.sources:
+            return snapshot.sources[source_id]
+
+    rows = await _aggregate(session, AggregationQuery(
+        dimensions=("source",),
+        grain=grain,
+        source_ids=(source_id,),
+        from_date=from_date,
+        to_date=to_date
+    ))
+    return _summarize(rows, source_id=source_id)
+
+
+@cached(
+    dashboard_cache,
+    tags=lambda args: {
+        "category", "source",
+        *(category_tag(category_id) for category_id in args["category_ids"]),
+        *(source_tag(source_id) for source_id in args["source_ids"])
+    },
+    window=lambda args: (args["from_date"], args["to_date"])
+)
+async def get_stats_batch(
+    session: AsyncSession,
+    category_ids: tuple[int, ...] = (),
+    source_ids: tuple[int, ...] = (),
+    from_date: date | None = None,
+    to_date: date | None = None,
+    grain: Grain = "week"
+) -> LeadStatsBatch:
+    """Weekly (or monthly, quarterly, yearly) stats for many categories and sources in one round-trip."""
+    if from_date is None and to_date is None and grain == "week":
+        snapshot = await current_snapshot(session)
+        if (
+            snapshot is not None
+            and all(category_id in snapshot.categories for category_id in category_ids)
+            and all(source_id in snapshot.sources for source_id in source_ids)
+        ):
+            return LeadStatsBatch(
+                categories={category_id: snapshot.categories[category_id] for category_id in category_ids},
+                sources={source_id: snapshot.sources[source_id] for source_id in source_ids}
+            )
+
+    parts = {}
+    if category_ids:
+        parts["category"] = AggregationQuery(
+            dimensions=("category",), grain=grain, category_ids=category_ids, from_date=from_date, to_date=to_date
+        )
+    if source_ids:
+        parts["source"] = AggregationQuery(
+            dimensions=("source",), grain=grain, source_ids=source_ids, from_date=from_date, to_date=to_date
+        )
+
+    results = await _aggregate_parts(session, parts)
+    by_category = group_by_dimension(results.get("category", []), "category")
+    by_source = group_by_dimension(results.get("source", []), "source")
+
+    return LeadStatsBatch(
+        categories={
+            category_id: _summarize(by_category.get(category_id, []), category_id=category_id)
+            for category_id in category_ids
+        },
+        sources={
+            source_id: _summarize(by_source.get(source_id, []), source_id=source_id)
+            for source_id in source_ids
+        }
+    )
+
 
-    conditions = [LeadMetric.source_id == source_id]
+async def build_snapshot(session: AsyncSession) -> DashboardSnapshot:
+    """Overview and all-time weekly series of every category and source with metrics."""
+    # Read the version first: a write landing mid-build then makes the snapshot stale, never wrong
+    version = await get_data_version(session)
+    overview = await _summary_overview(session)
+    results = await _aggregate_parts(session, {
+        "category": AggregationQuery(dimensions=("category",)),
+        "source": AggregationQuery(dimensions=("source",))
+    })
+
+    return DashboardSnapshot(
+        version=version,
+        computed_at=datetime.now(timezone.utc),
+        by_category=tuple(overview["by_category"]),
+        by_source=tuple(overview["by_source"]),
+        totals=overview["totals"],
+        categories=MappingProxyType({
+            category_id: _summarize(rows, category_id=category_id)
+            for category_id, rows in group_by_dimension(results["category"], "category").items()
+        }),
+        sources=MappingProxyType({
+            source_id: _summarize(rows, source_id=source_id)
+            for source_id, rows in group_by_dimension(results["source"], "source").items()
+        })
+    )
+
+
+async def refresh_snapshot(sessionmaker) -> None:
+    async with sessionmaker() as session:
+        publish_snapshot(await build_snapshot(session))
+
+
+@cached(
+    dashboard_cache,
+    tags=lambda args: {AGGREGATES},
+    window=lambda args: (args["query"].from_date, args["query"].to_date)
+)
+async def get_aggregate(session: AsyncSession, query: AggregationQuery) -> list[dict]:
+    """Any dimension x grain breakdown, for ad-hoc dashboard charts."""
+    return _round_lead_cost(await _aggregate(session, query))
+
+
+@cached(
+    dashboard_cache,
+    tags=lambda args: {AGGREGATES},
+    window=lambda args: (args["query"].from_date, args["query"].to_date)
+)
+async def get_series(session: AsyncSession, query: SeriesQuery) -> list[dict]:
+    """Week-over-week change, moving average and running total per category or source."""
+    return await series(session, query)
 
+
+LEAD_METRICS_BY_WEEKS_BATCH_SIZE = 5000
+
+
+async def _lead_metrics_by_weeks_rows(
+    session: AsyncSession,
+    after: tuple | None,
+    limit: int | None,
+    from_date: date | None,
+    to_date: date | None,
+    category_ids: tuple[int, ...] | None,
+    source_ids: tuple[int, ...] | None
+):
+    """Flat metric rows ordered by week, and the key of the next page of weeks.
+
+    Date bounds follow get_stats_by_category: a week is included when it lies
+    entirely inside [from_date, to_date].
+    """
+    week_conditions = []
     if from_date:
-        conditions.append(Week.start_date >= from_date)
+        week_conditions.append(Week.start_date >= from_date)
     if to_date:
-        conditions.append(Week.end_date <= to_date)
+        week_conditions.append(Week.end_date <= to_date)
+
+    metric_conditions = []
+    if category_ids:
+        metric_conditions.append(LeadMetric.category_id.in_(category_ids))
+    if source_ids:
+        metric_conditions.append(LeadMetric.source_id.in_(source_ids))
 
     stmt = (
         select(
-            Week.id,
+            LeadMetric.id,
+            LeadMetric.amount,
+            LeadMetric.leads_count,
+            LeadMetric.category_id,
+            Category.name.label("category_name"),
+            LeadMetric.source_id,
+            Source.name.label("source_name"),
+            LeadMetric.week_id,
             Week.start_date,
-            Week.end_date,
-            func.sum(LeadMetric.amount).label("amount"),
-            func.sum(LeadMetric.leads_count).label("leads_count")
+            Week.end_date
         )
-        .join(Week, LeadMetric.week_id == Week.id)
-        .where(and_(*conditions))
-        .group_by(Week.id, Week.start_date, Week.end_date)
-        .order_by(Week.start_date)
+        .join(Category, Category.id == LeadMetric.category_id)
+        .join(Source, Source.id == LeadMetric.source_id)
+        .join(Week, Week.id == LeadMetric.week_id)
+        .where(*week_conditions, *metric_conditions)
+        .order_by(Week.start_date, Week.end_date, LeadMetric.id)
     )
 
-    result = await session.execute(stmt)
-    rows = result.all()
-
-    weekly_stats = [
-        WeeklyStats(
-            id=week_id,
-            lead_metric_id=None,
-            source_id=source_id,
-            category_id=None,
-            start_date=format_date(start),
-            end_date=format_date(end),
-            amount=amount or 0,
-            leads_count=leads or 0,
-            lead_cost=round((amount or 0) / leads, 2) if leads else None
+    next_key = None
+    if limit is not None:
+        # Page over weeks, keyed on (start_date, id), then load only their metrics
+        # Only weeks that have matching metrics take a slot on the page
+        has_metrics = select(LeadMetric.id).where(LeadMetric.week_id == Week.id, *metric_conditions).exists()
+        week_result = await session.execute(
+            keyset(
+                select(Week.id, Week.start_date).where(*week_conditions, has_metrics),
+                [Week.start_date, Week.id],
+                after,
+                limit
+            )
         )
-        for week_id, start, end, amount, leads in rows
-    ]
+        week_page = paginate(week_result.all(), limit, key=lambda row: (row.start_date, row.id))
+        next_key = week_page.next_key
+        stmt = stmt.where(LeadMetric.week_id.in_([row.id for row in week_page.items]))
 
-    for row in rows:
-        print('ROW:', row, flush=True)
-
-    total_amount = sum(ws.amount for ws in weekly_stats)
-    total_leads = sum(ws.leads_count for ws in weekly_stats)
+    result = await session.stream(stmt.execution_options(yield_per=LEAD_METRICS_BY_WEEKS_BATCH_SIZE))
+    return result, next_key
 
-    lead_cost = round(total_amount / total_leads, 2) if total_leads > 0 else None
 
-    return LeadStatsSummary(
-        total_leads=total_leads,
-        total_amount=total_amount,
-        lead_cost=lead_cost,
-        weekly_stats=weekly_stats
+async def get_lead_metrics_by_weeks(
+    session: AsyncSession,
+    after: tuple | None = None,
+    limit: int | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    category_ids: tuple[int, ...] | None = None,
+    source_ids: tuple[int, ...] | None = None
+) -> tuple[AsyncIterator[dict], tuple | None]:
+    """Metrics grouped by week, oldest week first, and the key of the next page.
+
+    Selects only the columns the response needs, already ordered by week, so
+    each week group is yielded as soon as the rows of the next week arrive:
+    only one week's metrics are held at a time, never the whole result.
+    Category, source and week fragments are built once per entity and shared
+    between items. The groups are read from a server-side cursor and must be
+    consumed before the session closes. Not cached: the result grows with the
+    table and would crowd every other entry out of the cache.
+    """
+    result, next_key = await _lead_metrics_by_weeks_rows(
+        session, after, limit, from_date, to_date, category_ids, source_ids
     )
+    return _week_groups(result), next_key
+
+
+async def _week_groups(result) -> AsyncIterator[dict]:
+    categories: dict[int, dict] = {}
+    sources: dict[int, dict] = {}
+    weeks: dict[int, dict] = {}
+
+    group = None
+    group_key = None
+
+    async for (
+        metric_id, amount, leads_count,
+        category_id, category_name, source_id, source_name,
+        week_id, start_date, end_date
+    ) in result:
+        if (start_date, end_date) != group_key:
+            if group is not None:
+                yield group
+            group_key = (start_date, end_date)
+            group = {"start_date": start_date, "end_date": end_date, "metrics": []}
+
+        category = categories.get(category_id)
+        if category is None:
+            category = categories[category_id] = {"id": category_id, "name": category_name}
+        source = sources.get(source_id)
+        if source is None:
+            source = sources[source_id] = {"id": source_id, "name": source_name}
+        week = weeks.get(week_id)
+        if week is None:
+            week = weeks[week_id] = {
+                "id": week_id,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat()
+            }
+
+        group["metrics"].append({
+            "lead_metric_id": metric_id,
+            "amount": amount,
+            "leads_count": leads_count,
+            "category": category,
+            "source": source,
+            "week": week
+        })
 
+    if group is not None:
+        yield group
 
 
-async def get_lead_metrics_by_weeks(session: AsyncSession):
-    stmt = select(LeadMetric).options(
-        joinedload(LeadMetric.week),
-        joinedload(LeadMetric.category),
-        joinedload(LeadMetric.source)
+async def get_lead_metrics_by_weeks_columnar(
+    session: AsyncSession,
+    after: tuple | None = None,
+    limit: int | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    category_ids: tuple[int, ...] | None = None,
+    source_ids: tuple[int, ...] | None = None
+) -> Page[dict]:
+    """Same rows as get_lead_metrics_by_weeks, normalized for charting clients.
+
+    Categories, sources and weeks are sent once; metrics are parallel arrays
+    referencing them by id, in week order. The page holds a single document.
+    """
+    result, next_key = await _lead_metrics_by_weeks_rows(
+        session, after, limit, from_date, to_date, category_ids, source_ids
     )
-    result = await session.execute(stmt)
-    lead_metrics = result.scalars().all()
-
-    week_dict = defaultdict(list)
-
-    for metric in lead_metrics:
-        week_key = (metric.week.start_date, metric.week.end_date)
-        week_dict[week_key].append({
-            "lead_metric_id": metric.id,
-            "amount": metric.amount,
-            "leads_count": metric.leads_count,
-            "category": {
-                "id": metric.category.id,
-                "name": metric.category.name
-            },
-            "source": {
-                "id": metric.source.id,
-                "name": metric.source.name
-            },
-            "week": {
-                "id": metric.week.id,
-                "start_date": metric.week.start_date.isoformat(),
-                "end_date": metric.week.end_date.isoformat()
-            }
-        })
 
-    return [
-        {
-            "start_date": start,
-            "end_date": end,
-            "metrics": metrics
-        }
-        for (start, end), metrics in sorted(week_dict.items())
-    ]
\ No newline at end of file
+    categories: dict[int, str] = {}
+    sources: dict[int, str] = {}
+    weeks: dict[int, dict] = {}
+    columns: dict[str, list] = {
+        "lead_metric_id": [],
+        "week_id": [],
+        "category_id": [],
+        "source_id": [],
+        "amount": [],
+        "leads_count": []
+    }
+
+    async for (
+        metric_id, amount, leads_count,
+        category_id, category_name, source_id, source_name,
+        week_id, start_date, end_date
+    ) in result:
+        if category_id not in categories:
+            categories[category_id] = category_name
+        if source_id not in sources:
+            sources[source_id] = source_name
+        if week_id not in weeks:
+            weeks[week_id] = {"id": week_id, "start_date": start_date, "end_date": end_date}
+
+        columns["lead_metric_id"].append(metric_id)
+        columns["week_id"].append(week_id)
+        columns["category_id"].append(category_id)
+        columns["source_id"].append(source_id)
+        columns["amount"].append(amount)
+        columns["leads_count"].append(leads_count)
+
+    return Page([{
+        "categories": [{"id": id, "name": name} for id, name in categories.items()],
+        "sources": [{"id": id, "name": name} for id, name in sources.items()],
+        "weeks": list(weeks.values()),
+        "metrics": columns
+    }], next_key)
+
+
+@cached(
+    dashboard_cache,
+    tags=lambda args: {AGGREGATES},
+    window=lambda args: (args["query"].from_date, args["query"].to_date)
+)
+async def get_ranking(session: AsyncSession, query: RankingQuery) -> list[dict]:
+    """Best or worst categories, sources or pairs by one metric.
+
+    Ranked on the exact lead_cost; only the reported figure is rounded.
+    """
+    return _round_lead_cost(await ranking(session, query))
@@ -0,0 +1,40 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import upsert_insert
+from app.db.models import DataVersion
+
+
+DATA_VERSION_ID = 1
+# session.info key of the version a request reads once and keys its ETag and cached results on
+SESSION_VERSION_KEY = "data_version"
+
+
+async def bump_data_version(session: AsyncSession) -> int:
+    """Advance the data version in its own short transaction after a write committed; returns the new version.
+
+    A reader racing the bump can at worst pair new data with the old version
+    (one extra full response) or answer 304 for the few milliseconds before it.
+    """
+    stmt = upsert_insert(session, DataVersion).values(id=DATA_VERSION_ID, version=1)
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={"version": DataVersion.version + 1}
+    ))
+    version = await get_data_version(session)
+    await session.commit()
+    session.info.pop(SESSION_VERSION_KEY, None)
+    return version
+
+
+async def get_data_version(session: AsyncSession) -> int:
+    version = await session.scalar(select(DataVersion.version).where(DataVersion.id == DATA_VERSION_ID))
+    return version or 0
+
+
+async def request_data_version(session: AsyncSession) -> int:
+    """The data version read once per session, so a request's ETag and cache lookups agree."""
+    version = session.info.get(SESSION_VERSION_KEY)
+    if version is None:
+        version = session.info[SESSION_VERSION_KEY] = await get_data_version(session)
+    return version
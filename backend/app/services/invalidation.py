@@ -0,0 +1,113 @@
+"""Write-side hooks that keep derived dashboard data in sync.
+
+Write services call these after a successful commit. Each hook drops the cached
+results the write may have changed, then bumps the data version behind the HTTP
+ETags and the cache keys, and notifies the `on_data_changed` listeners (e.g. the
+materialized view refresher). Invalidating first means no reader of the new
+version can find a result of this worker computed before the write. Metric
+writes also patch the in-memory cube when it is loaded.
+"""
+from typing import Callable, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import dashboard_cache, Period
+from app.db.models import Week
+from app.services.cube import cube_metrics_changed
+from app.services.data_version import bump_data_version
+
+
+OVERVIEW = "overview"
+AGGREGATES = "aggregates"
+
+
+_listeners: list[Callable[[], None]] = []
+
+
+def on_data_changed(listener: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback run after every committed write; it must not block."""
+    _listeners.append(listener)
+    return listener
+
+
+def off_data_changed(listener: Callable[[], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _notify() -> None:
+    for listener in _listeners:
+        listener()
+
+
+def category_tag(category_id: int) -> tuple[str, int]:
+    return ("category", category_id)
+
+
+def source_tag(source_id: int) -> tuple[str, int]:
+    return ("source", source_id)
+
+
+async def metrics_changed(session: AsyncSession, keys: Iterable[tuple[int, int, int]]) -> None:
+    """Invalidate results depending on the given (category_id, source_id, week_id) cells."""
+    keys = set(keys)
+    tags_by_week: dict[int, set] = {}
+    for category_id, source_id, week_id in keys:
+        tags_by_week.setdefault(week_id, {AGGREGATES}).update(
+            (category_tag(category_id), source_tag(source_id))
+        )
+    if not tags_by_week:
+        return
+
+    result = await session.execute(
+        select(Week.id, Week.start_date, Week.end_date).where(Week.id.in_(tags_by_week))
+    )
+    periods = {week_id: (start, end) for week_id, start, end in result.all()}
+    dashboard_cache.invalidate({OVERVIEW})
+    for week_id, tags in tags_by_week.items():
+        dashboard_cache.invalidate(tags, periods.get(week_id))
+
+    version = await bump_data_version(session)
+    # Before notifying, so the cube reload job finds the cube current and skips
+    await cube_metrics_changed(session, keys, version)
+    _notify()
+
+
+async def entities_created(session: AsyncSession) -> None:
+    """A category, source or week without metrics was added: only listings changed."""
+    await bump_data_version(session)
+    _notify()
+
+
+async def week_changed(session: AsyncSession, *periods: Period) -> None:
+    """A week moved or disappeared: every result covering its dates is stale."""
+    dashboard_cache.invalidate({OVERVIEW})
+    for period in periods:
+        dashboard_cache.invalidate({"category", "source", AGGREGATES}, period)
+    await bump_data_version(session)
+    _notify()
+
+
+async def category_changed(session: AsyncSession, category_id: int, source_ids: Iterable[int] = ()) -> None:
+    """A category was renamed or deleted; `source_ids` lost metrics with it."""
+    dashboard_cache.invalidate({
+        OVERVIEW,
+        AGGREGATES,
+        category_tag(category_id),
+        *(source_tag(source_id) for source_id in source_ids)
+    })
+    await bump_data_version(session)
+    _notify()
+
+
+async def source_changed(session: AsyncSession, source_id: int, category_ids: Iterable[int] = ()) -> None:
+    """A source was renamed or deleted; `category_ids` lost metrics with it."""
+    dashboard_cache.invalidate({
+        OVERVIEW,
+        AGGREGATES,
+        source_tag(source_id),
+        *(category_tag(category_id) for category_id in category_ids)
+    })
+    await bump_data_version(session)
+    _notify()
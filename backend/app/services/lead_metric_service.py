@@ -1,11 +1,18 @@
-from typing import List, Optional, Sequence, Tuple
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Integer, Row, func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
-from app.db.models import LeadMetric
-from app.schemas.lead_metric import LeadMetricCreate, LeadMetricUpdate
+from app.core.pagination import keyset
+from app.db.dialect import dialect_name, upsert_insert
+from app.db.models import LeadMetric, Category, Week
+from app.schemas.enum.lead import BulkRowStatus, LeadPricingType
+from app.schemas.lead_metric import LeadMetricCreate, LeadMetricUpdate, LeadMetricBulkResult, LeadMetricBulkRowResult
+from app.services.pricing import lead_spend, pricing_types
+from app.services.rollup_service import MetricDelta, apply_rollup_deltas, metric_added, metric_removed
+from app.services.invalidation import metrics_changed
 
 
 async def get_leads_filtered(
@@ -13,6 +20,8 @@ async def get_leads_filtered(
     week_id: Optional[int],
     category_id: Optional[int],
     source_id: Optional[int],
+    after: tuple | None = None,
+    limit: int | None = None
 ) -> Sequence[LeadMetric]:
     query = select(LeadMetric)
 
@@ -23,11 +32,47 @@ async def get_leads_filtered(
     if source_id is not None:
         query = query.where(LeadMetric.source_id == source_id)
 
-    result = await session.execute(query)
+    result = await session.execute(keyset(query, [LeadMetric.id], after, limit))
     leads = result.scalars().all()
     return leads
 
 
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = (
+    LeadMetric.id,
+    LeadMetric.category_id,
+    LeadMetric.source_id,
+    LeadMetric.week_id,
+    LeadMetric.amount,
+    LeadMetric.leads_count,
+)
+
+
+async def stream_lead_metric_batches(
+    session: AsyncSession,
+    week_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    source_id: Optional[int] = None,
+) -> AsyncIterator[Sequence[Row]]:
+    """Yield lead metric rows in id order through a server-side cursor.
+
+    Only EXPORT_BATCH_SIZE rows are held in memory at a time.
+    """
+    query = select(*EXPORT_COLUMNS).order_by(LeadMetric.id)
+
+    if week_id is not None:
+        query = query.where(LeadMetric.week_id == week_id)
+    if category_id is not None:
+        query = query.where(LeadMetric.category_id == category_id)
+    if source_id is not None:
+        query = query.where(LeadMetric.source_id == source_id)
+
+    result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for batch in result.partitions():
+        yield batch
+
+
 async def get_all_lead_metrics(session: AsyncSession):
     result = await session.execute(select(LeadMetric))
     return result.scalars().all()
@@ -37,6 +82,21 @@ async def get_lead_metric_by_id(session: AsyncSession, metric_id: int):
     return await session.get(LeadMetric, metric_id)
 
 
+async def _source_pricing(session: AsyncSession, *source_ids: int) -> dict[int, LeadPricingType]:
+    pricing = await pricing_types(session, source_ids)
+    if len(pricing) < len(set(source_ids)):
+        raise HTTPException(status_code=404, detail='Источник не найден')
+    return pricing
+
+
+async def _require_references(session: AsyncSession, category_id: int, week_id: int) -> None:
+    # 404 like an unknown source rather than the IntegrityError the flush would raise
+    if await session.scalar(select(Category.id).where(Category.id == category_id)) is None:
+        raise HTTPException(status_code=404, detail='Категория не найдена')
+    if await session.scalar(select(Week.id).where(Week.id == week_id)) is None:
+        raise HTTPException(status_code=404, detail='Неделя не найдена')
+
+
 async def create_lead_metric_in_db(
     session: AsyncSession,
     metric_data: LeadMetricCreate
@@ -52,6 +112,8 @@ async def create_lead_metric_in_db(
     if existing:
         return existing, False
 
+    pricing = await _source_pricing(session, metric_data.source_id)
+    await _require_references(session, metric_data.category_id, metric_data.week_id)
     new_metric = LeadMetric(
         amount=metric_data.amount,
         leads_count=metric_data.leads_count,
@@ -61,8 +123,10 @@ async def create_lead_metric_in_db(
     )
 
     session.add(new_metric)
+    await apply_rollup_deltas(session, [metric_added(new_metric, pricing[new_metric.source_id])])
     await session.commit()
     await session.refresh(new_metric)
+    await metrics_changed(session, [(new_metric.category_id, new_metric.source_id, new_metric.week_id)])
 
     return new_metric, True
 
@@ -93,17 +157,239 @@ async def update_lead_metric_in_db(
                 detail='Метрика с такими category_id, source_id и week_id уже существует'
             )
 
+    pricing = await _source_pricing(session, metric.source_id, metric_data.source_id)
+    await _require_references(session, metric_data.category_id, metric_data.week_id)
+    previous = metric_removed(metric, pricing[metric.source_id])
+
     metric.amount = metric_data.amount
     metric.leads_count = metric_data.leads_count
     metric.category_id = metric_data.category_id
     metric.source_id = metric_data.source_id
     metric.week_id = metric_data.week_id
 
+    await apply_rollup_deltas(session, [previous, metric_added(metric, pricing[metric.source_id])])
     await session.commit()
     await session.refresh(metric)
+    await metrics_changed(session, [
+        (previous.category_id, previous.source_id, previous.week_id),
+        (metric.category_id, metric.source_id, metric.week_id)
+    ])
     return metric
 
 
 async def delete_lead_metric_in_db(session: AsyncSession, metric):
+    pricing = await _source_pricing(session, metric.source_id)
+    removed = metric_removed(metric, pricing[metric.source_id])
+    await apply_rollup_deltas(session, [removed])
     await session.delete(metric)
     await session.commit()
+    await metrics_changed(session, [(removed.category_id, removed.source_id, removed.week_id)])
+
+
+BULK_LOOKUP_CHUNK = 5000
+
+
+async def _existing_ids(session: AsyncSession, model, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    result = await session.execute(select(model.id).where(model.id.in_(ids)))
+    return set(result.scalars().all())
+
+
+def _unnested(**columns: Sequence[int]):
+    """A PostgreSQL derived table of parallel integer arrays, one row per position.
+
+    One array parameter per column instead of one per value, and set-based plans
+    instead of the row-by-row ones of long IN lists or executemany.
+    """
+    return func.unnest(*(
+        literal(list(values), ARRAY(Integer)) for values in columns.values()
+    )).table_valued(*columns).render_derived()
+
+
+def _metric_keys_in(session: AsyncSession, keys: Sequence[tuple[int, int, int]]):
+    """lead_metrics rows whose (category_id, source_id, week_id) is one of `keys`."""
+    columns = tuple_(LeadMetric.category_id, LeadMetric.source_id, LeadMetric.week_id)
+    if dialect_name(session) != "postgresql":
+        return columns.in_(keys)
+    category_ids, source_ids, week_ids = zip(*keys)
+    keys = _unnested(category_id=category_ids, source_id=source_ids, week_id=week_ids)
+    return columns.in_(select(keys.c.category_id, keys.c.source_id, keys.c.week_id))
+
+
+async def _update_values(session: AsyncSession, rows: list[dict]) -> None:
+    """Set amount and leads_count of the lead_metrics rows with the given ids."""
+    if dialect_name(session) != "postgresql":
+        await session.execute(update(LeadMetric), rows)
+        return
+    values = _unnested(
+        id=[row["id"] for row in rows],
+        amount=[row["amount"] for row in rows],
+        leads_count=[row["leads_count"] for row in rows]
+    )
+    await session.execute(
+        update(LeadMetric)
+        .where(LeadMetric.id == values.c.id)
+        .values(amount=values.c.amount, leads_count=values.c.leads_count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _insert_new(session: AsyncSession, rows: list[dict]):
+    """Insert the rows whose key is not taken yet, returning id and key of each inserted one."""
+    stmt = upsert_insert(session, LeadMetric)
+    if dialect_name(session) == "postgresql":
+        values = _unnested(**{column: [row[column] for row in rows] for column in rows[0]})
+        stmt = stmt.from_select(list(rows[0]), select(*values.c))
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=[LeadMetric.category_id, LeadMetric.source_id, LeadMetric.week_id]
+    ).returning(LeadMetric.id, LeadMetric.category_id, LeadMetric.source_id, LeadMetric.week_id)
+    if dialect_name(session) == "postgresql":
+        return await session.execute(stmt)
+    # executemany + RETURNING is batched by SQLAlchemy's insertmanyvalues
+    return await session.execute(stmt, rows)
+
+
+async def bulk_upsert_lead_metrics(
+    session: AsyncSession,
+    metrics_data: List[LeadMetricCreate]
+) -> LeadMetricBulkResult:
+    """Insert or update many metrics.
+
+    New keys are inserted with INSERT ... ON CONFLICT DO NOTHING; the keys that
+    conflicted are then locked, read and updated. Created vs. updated and the
+    previous values behind the rollup deltas therefore come from the rows the
+    insert actually wrote or the locked rows, never from a read a concurrent
+    insert could have overtaken.
+
+    Rows with unknown category/source/week ids, or repeating a
+    (category_id, source_id, week_id) that appears later in the same request,
+    are reported as failed and skipped; everything else is written in one
+    transaction together with the rollup deltas.
+    """
+    results: list[LeadMetricBulkRowResult | None] = [None] * len(metrics_data)
+
+    category_ids = await _existing_ids(session, Category, {m.category_id for m in metrics_data})
+    # Known sources with their pricing, needed for the spend of every rollup delta
+    source_pricing = await pricing_types(session, {m.source_id for m in metrics_data})
+    source_ids = source_pricing.keys()
+    week_ids = await _existing_ids(session, Week, {m.week_id for m in metrics_data})
+
+    # Last occurrence of a key wins, like applying the rows one by one would
+    rows_by_key: dict[tuple[int, int, int], int] = {}
+    for index, metric in enumerate(metrics_data):
+        missing = [
+            name for name, value, known in (
+                ("category_id", metric.category_id, category_ids),
+                ("source_id", metric.source_id, source_ids),
+                ("week_id", metric.week_id, week_ids),
+            )
+            if value not in known
+        ]
+        if missing:
+            results[index] = LeadMetricBulkRowResult(
+                index=index,
+                status=BulkRowStatus.FAILED,
+                error=f"Unknown {', '.join(missing)}"
+            )
+            continue
+
+        key = (metric.category_id, metric.source_id, metric.week_id)
+        if key in rows_by_key:
+            results[rows_by_key[key]] = LeadMetricBulkRowResult(
+                index=rows_by_key[key],
+                status=BulkRowStatus.FAILED,
+                error="Superseded by a later row with the same category_id, source_id and week_id"
+            )
+        rows_by_key[key] = index
+
+    keys = list(rows_by_key)
+    metric_ids: dict[tuple[int, int, int], int] = {}
+    existing: dict[tuple[int, int, int], tuple[int, int]] = {}
+    pending = keys
+    while pending:
+        # RETURNING lists only the rows this statement inserted, so "created" cannot be
+        # claimed for a key a concurrent transaction inserted after we looked
+        result = await _insert_new(session, [
+            {
+                "category_id": key[0],
+                "source_id": key[1],
+                "week_id": key[2],
+                "amount": metrics_data[rows_by_key[key]].amount,
+                "leads_count": metrics_data[rows_by_key[key]].leads_count
+            }
+            for key in pending
+        ])
+        for metric_id, category_id, source_id, week_id in result.all():
+            metric_ids[(category_id, source_id, week_id)] = metric_id
+
+        # The rest exist (any concurrent insert has committed by now): lock them and
+        # read the values the rollup deltas are taken from
+        conflicting = [key for key in pending if key not in metric_ids]
+        for start in range(0, len(conflicting), BULK_LOOKUP_CHUNK):
+            result = await session.execute(
+                select(
+                    LeadMetric.id,
+                    LeadMetric.category_id,
+                    LeadMetric.source_id,
+                    LeadMetric.week_id,
+                    LeadMetric.amount,
+                    LeadMetric.leads_count
+                )
+                .where(_metric_keys_in(session, conflicting[start:start + BULK_LOOKUP_CHUNK]))
+                .with_for_update()
+            )
+            for metric_id, category_id, source_id, week_id, amount, leads in result.all():
+                key = (category_id, source_id, week_id)
+                metric_ids[key] = metric_id
+                existing[key] = (amount, leads)
+        # Deleted between the insert and the lock: try inserting them again
+        pending = [key for key in conflicting if key not in existing]
+
+    if keys:
+        if existing:
+            await _update_values(session, [
+                {
+                    "id": metric_ids[key],
+                    "amount": metrics_data[rows_by_key[key]].amount,
+                    "leads_count": metrics_data[rows_by_key[key]].leads_count
+                }
+                for key in existing
+            ])
+
+        deltas = []
+        for key, index in rows_by_key.items():
+            metric = metrics_data[index]
+            previous = existing.get(key)
+            pricing_type = source_pricing[key[1]]
+            spend = lead_spend(metric.amount, metric.leads_count, pricing_type)
+            if previous is None:
+                deltas.append(MetricDelta(*key, metric.amount, metric.leads_count, 1, spend))
+            else:
+                deltas.append(MetricDelta(
+                    *key,
+                    metric.amount - previous[0],
+                    metric.leads_count - previous[1],
+                    0,
+                    spend - lead_spend(*previous, pricing_type)
+                ))
+            results[index] = LeadMetricBulkRowResult(
+                index=index,
+                status=BulkRowStatus.CREATED if previous is None else BulkRowStatus.UPDATED,
+                id=metric_ids[key]
+            )
+
+        await apply_rollup_deltas(session, deltas)
+        await session.commit()
+        await metrics_changed(session, keys)
+
+    counts = {status: 0 for status in BulkRowStatus}
+    for row in results:
+        counts[row.status] += 1
+
+    return LeadMetricBulkResult(
+        created=counts[BulkRowStatus.CREATED],
+        updated=counts[BulkRowStatus.UPDATED],
+        failed=counts[BulkRowStatus.FAILED],
+        items=results
+    )
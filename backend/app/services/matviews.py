@@ -0,0 +1,91 @@
+"""Refreshing the dashboard materialized views and reporting how fresh they are.
+
+Writes only trigger the "matviews" scheduler job (see app/main.py). It waits
+until writes have been quiet for the debounce interval, or the max delay has
+passed since the first unrefreshed write, and then runs
+REFRESH MATERIALIZED VIEW CONCURRENTLY so readers are never blocked.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.cache import dashboard_cache
+from app.core.config import settings
+from app.db.dialect import dialect_name, upsert_insert
+from app.db.models import MATVIEWS, ViewRefresh
+from app.services.data_version import bump_data_version, get_data_version
+from app.services.invalidation import OVERVIEW, AGGREGATES
+
+
+logger = logging.getLogger(__name__)
+
+VIEW_REFRESH_ID = 1
+MATVIEW_DIALECTS = {"postgresql"}
+
+
+def matviews_enabled(session: AsyncSession) -> bool:
+    """Read aggregates from the materialized views; elsewhere the rollup tables stand in."""
+    return settings.DASHBOARD_AGGREGATE_SOURCE == "matview" and dialect_name(session) in MATVIEW_DIALECTS
+
+
+async def refresh_matviews(engine: AsyncEngine, sessionmaker: async_sessionmaker) -> None:
+    """Refresh every view, then record the refresh and advance the data version together."""
+    async with sessionmaker() as session:
+        version = await get_data_version(session)
+
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        # CONCURRENTLY cannot run inside a transaction block
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for view in MATVIEWS:
+            await conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.__tablename__}"))
+
+    async with sessionmaker() as session:
+        # The views hold everything committed up to `version`; the bump below makes it
+        # version + 1. A write racing the refresh bumps past that and reads as stale.
+        stmt = upsert_insert(session, ViewRefresh).values(
+            id=VIEW_REFRESH_ID,
+            refreshed_at=datetime.now(timezone.utc),
+            data_version=version + 1
+        )
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"refreshed_at": stmt.excluded.refreshed_at, "data_version": stmt.excluded.data_version}
+        ))
+        await bump_data_version(session)
+
+    dashboard_cache.invalidate({OVERVIEW, AGGREGATES, "category", "source"})
+    logger.info("Refreshed %d materialized views in %.1f ms", len(MATVIEWS), (time.perf_counter() - started) * 1000)
+
+
+async def get_view_freshness(session: AsyncSession) -> dict:
+    """When the views were refreshed and whether writes have landed since.
+
+    `max_staleness_seconds` is the bound the refresher keeps after a write,
+    excluding the refresh itself.
+    """
+    refresh = (await session.execute(
+        select(ViewRefresh.refreshed_at, ViewRefresh.data_version).where(ViewRefresh.id == VIEW_REFRESH_ID)
+    )).first()
+    version = await get_data_version(session)
+    return {
+        "source": "matview",
+        "refreshed_at": refresh.refreshed_at if refresh else None,
+        "stale": refresh is None or refresh.data_version < version,
+        "max_staleness_seconds": settings.DASHBOARD_MATVIEW_REFRESH_MAX_DELAY
+    }
+
+
+def freshness_note(freshness: dict | None) -> str:
+    """Suffix for the response message, e.g. ' (as of 2024-07-01 12:00:00 UTC, refresh pending within 30s)'."""
+    if freshness is None:
+        return ""
+    if freshness["refreshed_at"] is None:
+        return " (materialized views not refreshed yet)"
+    note = f" (as of {freshness['refreshed_at']:%Y-%m-%d %H:%M:%S %Z}"
+    if freshness["stale"]:
+        note += f", refresh pending within {freshness['max_staleness_seconds']:g}s"
+    return note + ")"
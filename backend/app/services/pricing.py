@@ -0,0 +1,36 @@
+"""How much a lead metric cost, by the pricing type of its source.
+
+FIXED_PER_LEAD sources report the price of one lead as `amount`, so the spend
+is amount * leads_count. TOTAL_DIVIDED sources report the total spend as
+`amount`. Lead cost is then sum(spend) / sum(leads_count), which stays correct
+when sources with different pricing are added up.
+"""
+from typing import Iterable
+
+from sqlalchemy import BigInteger, case, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Source
+from app.schemas.enum.lead import LeadPricingType
+
+
+def lead_spend(amount: int, leads_count: int, pricing_type: LeadPricingType) -> int:
+    if pricing_type == LeadPricingType.FIXED_PER_LEAD:
+        return amount * leads_count
+    return amount
+
+
+def spend_expression(amount, leads_count, pricing_type):
+    """SQL counterpart of `lead_spend` over lead_metrics joined with sources."""
+    return case(
+        (pricing_type == LeadPricingType.FIXED_PER_LEAD, cast(amount, BigInteger) * leads_count),
+        else_=cast(amount, BigInteger)
+    )
+
+
+async def pricing_types(session: AsyncSession, source_ids: Iterable[int]) -> dict[int, LeadPricingType]:
+    source_ids = set(source_ids)
+    if not source_ids:
+        return {}
+    result = await session.execute(select(Source.id, Source.pricing_type).where(Source.id.in_(source_ids)))
+    return dict(result.tuples().all())
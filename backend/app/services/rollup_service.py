@@ -0,0 +1,195 @@
+from collections import defaultdict
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import upsert_insert
+from app.db.models import (
+    LeadMetric, Source, WeekCategoryRollup, WeekSourceRollup, CategoryRollup, SourceRollup
+)
+from app.schemas.enum.lead import LeadPricingType
+from app.services.pricing import lead_spend, spend_expression
+
+
+class MetricDelta(NamedTuple):
+    category_id: int
+    source_id: int
+    week_id: int
+    amount: int
+    leads_count: int
+    metrics_count: int
+    spend: int
+
+
+ROLLUPS = (
+    (WeekCategoryRollup, ("week_id", "category_id")),
+    (WeekSourceRollup, ("week_id", "source_id")),
+    (CategoryRollup, ("category_id",)),
+    (SourceRollup, ("source_id",)),
+)
+
+
+def metric_added(metric: LeadMetric, pricing_type: LeadPricingType) -> MetricDelta:
+    return MetricDelta(
+        metric.category_id, metric.source_id, metric.week_id,
+        metric.amount, metric.leads_count, 1,
+        lead_spend(metric.amount, metric.leads_count, pricing_type)
+    )
+
+
+def metric_removed(metric: LeadMetric, pricing_type: LeadPricingType) -> MetricDelta:
+    return MetricDelta(
+        metric.category_id, metric.source_id, metric.week_id,
+        -metric.amount, -metric.leads_count, -1,
+        -lead_spend(metric.amount, metric.leads_count, pricing_type)
+    )
+
+
+async def apply_rollup_deltas(session: AsyncSession, deltas: Iterable[MetricDelta]) -> None:
+    """Fold metric deltas into every rollup table inside the caller's transaction.
+
+    Deltas are pre-aggregated per rollup key, so a batch costs one upsert per
+    rollup table no matter how many metrics it touches. Keys the upsert leaves
+    without metrics are deleted by key, never by scanning the table.
+    """
+    deltas = list(deltas)
+    if not deltas:
+        return
+
+    for model, keys in ROLLUPS:
+        grouped: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+        for delta in deltas:
+            totals = grouped[tuple(getattr(delta, key) for key in keys)]
+            totals[0] += delta.amount
+            totals[1] += delta.leads_count
+            totals[2] += delta.metrics_count
+            totals[3] += delta.spend
+
+        rows = [
+            {
+                **dict(zip(keys, key)),
+                "amount": amount,
+                "leads_count": leads,
+                "metrics_count": count,
+                "spend": spend
+            }
+            for key, (amount, leads, count, spend) in grouped.items()
+            if amount or leads or count or spend
+        ]
+        if not rows:
+            continue
+
+        # executemany rather than .values(rows): the statement is compiled once and cached
+        stmt = upsert_insert(session, model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                "amount": model.amount + stmt.excluded.amount,
+                "leads_count": model.leads_count + stmt.excluded.leads_count,
+                "metrics_count": model.metrics_count + stmt.excluded.metrics_count,
+                "spend": model.spend + stmt.excluded.spend,
+            }
+        )
+        columns = [getattr(model, key) for key in keys]
+        result = await session.execute(stmt.returning(*columns, model.metrics_count), rows)
+        emptied = [tuple(row[:-1]) for row in result.all() if row[-1] <= 0]
+        if emptied:
+            await session.execute(delete(model).where(tuple_(*columns).in_(emptied)))
+
+
+async def retract_metrics(session: AsyncSession, *conditions) -> list[MetricDelta]:
+    """Remove matching metrics from the rollups before they are cascade-deleted.
+
+    Returns the applied deltas so callers know which cells were affected.
+    """
+    result = await session.execute(
+        select(
+            LeadMetric.category_id,
+            LeadMetric.source_id,
+            LeadMetric.week_id,
+            LeadMetric.amount,
+            LeadMetric.leads_count,
+            spend_expression(LeadMetric.amount, LeadMetric.leads_count, Source.pricing_type)
+        )
+        .join(Source, Source.id == LeadMetric.source_id)
+        .where(*conditions)
+    )
+    deltas = [
+        MetricDelta(category_id, source_id, week_id, -amount, -leads, -1, -spend)
+        for category_id, source_id, week_id, amount, leads, spend in result.all()
+    ]
+    await apply_rollup_deltas(session, deltas)
+    return deltas
+
+
+def _aggregate_raw(keys: tuple[str, ...]):
+    key_columns = [getattr(LeadMetric, key) for key in keys]
+    return (
+        select(
+            *key_columns,
+            func.sum(LeadMetric.amount).label("amount"),
+            func.sum(LeadMetric.leads_count).label("leads_count"),
+            func.count().label("metrics_count"),
+            func.sum(spend_expression(LeadMetric.amount, LeadMetric.leads_count, Source.pricing_type)).label("spend")
+        )
+        .join(Source, Source.id == LeadMetric.source_id)
+        .group_by(*key_columns)
+    )
+
+
+async def rollups_populated(session: AsyncSession) -> bool:
+    """False when metrics exist but the rollups were never built (fresh upgrade)."""
+    has_metrics = await session.scalar(select(LeadMetric.id).limit(1))
+    has_rollups = await session.scalar(select(CategoryRollup.category_id).limit(1))
+    return has_metrics is None or has_rollups is not None
+
+
+async def rebuild_rollups(session: AsyncSession) -> None:
+    """Recompute every rollup table from lead_metrics. Caller commits."""
+    for model, keys in ROLLUPS:
+        await session.execute(delete(model))
+        await session.execute(
+            insert(model).from_select(
+                [*keys, "amount", "leads_count", "metrics_count", "spend"],
+                _aggregate_raw(keys)
+            )
+        )
+
+
+async def check_rollups(session: AsyncSession) -> dict[str, list[dict]]:
+    """Compare rollups with a fresh aggregation of lead_metrics.
+
+    Returns the mismatching keys per rollup table; empty lists mean consistent.
+    """
+    mismatches: dict[str, list[dict]] = {}
+
+    for model, keys in ROLLUPS:
+        expected = {
+            tuple(row[:len(keys)]): tuple(row[len(keys):])
+            for row in (await session.execute(_aggregate_raw(keys))).all()
+        }
+        stored = {
+            tuple(row[:len(keys)]): tuple(row[len(keys):])
+            for row in (await session.execute(
+                select(
+                    *[getattr(model, key) for key in keys],
+                    model.amount,
+                    model.leads_count,
+                    model.metrics_count,
+                    model.spend
+                )
+            )).all()
+        }
+
+        mismatches[model.__tablename__] = [
+            {
+                **dict(zip(keys, key)),
+                "expected": expected.get(key),
+                "stored": stored.get(key)
+            }
+            for key in sorted(expected.keys() | stored.keys())
+            if expected.get(key) != stored.get(key)
+        ]
+
+    return mismatches
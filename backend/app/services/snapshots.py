@@ -0,0 +1,62 @@
+"""Precomputed dashboard snapshots for instant reads.
+
+The "snapshots" scheduler job (see app/main.py) recomputes the overview and
+the all-time weekly series of every category and source after writes and on a
+timer, and publishes them here as one immutable object. Readers use a snapshot
+only while its data version is the current one, so they never see results a
+later write has made stale: until the next recompute they take the live path.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Mapping
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import SNAPSHOT_READS
+from app.schemas.lead_stats import LeadStatsSummary
+from app.services.data_version import get_data_version
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    version: int
+    computed_at: datetime
+    by_category: tuple[dict, ...]
+    by_source: tuple[dict, ...]
+    totals: dict
+    categories: Mapping[int, LeadStatsSummary]
+    sources: Mapping[int, LeadStatsSummary]
+
+    def overview(self, include_totals: bool = False) -> dict:
+        return {
+            "by_category": self.by_category,
+            "by_source": self.by_source,
+            "totals": self.totals if include_totals else None
+        }
+
+
+_published: DashboardSnapshot | None = None
+
+
+def publish_snapshot(snapshot: DashboardSnapshot) -> None:
+    global _published
+    # Only ever move forward: a slow recompute must not replace a newer snapshot
+    if _published is None or snapshot.version >= _published.version:
+        _published = snapshot
+
+
+def latest_snapshot() -> DashboardSnapshot | None:
+    return _published
+
+
+async def current_snapshot(session: AsyncSession) -> DashboardSnapshot | None:
+    """The published snapshot, if it was computed at the session's current data version."""
+    snapshot = _published
+    if snapshot is None or not settings.SNAPSHOTS_ENABLED:
+        return None
+    if snapshot.version != await get_data_version(session):
+        SNAPSHOT_READS.inc(result="stale")
+        return None
+    SNAPSHOT_READS.inc(result="hit")
+    return snapshot
@@ -4,11 +4,18 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.db.models import Source
+from app.core.pagination import keyset
+from app.db.models import Source, LeadMetric
+from app.services.rollup_service import retract_metrics
+from app.services.invalidation import entities_created, source_changed
 from app.schemas.source import SourceCreate, SourceUpdate
 
-async def get_all_sources(session: AsyncSession) -> Sequence[Source]:
-    result = await session.execute(select(Source))
+async def get_all_sources(
+    session: AsyncSession,
+    after: tuple | None = None,
+    limit: int | None = None
+) -> Sequence[Source]:
+    result = await session.execute(keyset(select(Source), [Source.id], after, limit))
     return result.scalars().all()
 
 
@@ -29,6 +36,7 @@ async def create_source_in_db(session: AsyncSession, source_data: SourceCreate)
     new_source = Source(name=source_data.name)
     session.add(new_source)
     await session.commit()
+    await entities_created(session)
     await session.refresh(new_source)
     return new_source, True
 
@@ -55,9 +63,13 @@ async def update_source_in_db(
     session.add(source)
     await session.commit()
     await session.refresh(source)
+    await source_changed(session, source.id)
     return source
 
 
 async def delete_source_in_db(session: AsyncSession, source: Source) -> None:
+    source_id = source.id
+    retracted = await retract_metrics(session, LeadMetric.source_id == source_id)
     await session.delete(source)
-    await session.commit()
\ No newline at end of file
+    await session.commit()
+    await source_changed(session, source_id, {delta.category_id for delta in retracted})
\ No newline at end of file
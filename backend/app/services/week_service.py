@@ -3,15 +3,22 @@ from typing import Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.pagination import keyset
 from app.db.models import Week
 from app.db.models.category import Category
 from app.db.models.lead_metric import LeadMetric
 from app.db.models.source import Source
 from app.schemas.lead_metric import CategoryInWeekAndSource
+from app.services.rollup_service import retract_metrics
+from app.services.invalidation import entities_created, week_changed
 from app.schemas.week import SourceInWeek, WeekCreate, WeekUpdate
 
-async def get_all_weeks(session: AsyncSession) -> Sequence[Week]:
-    result = await session.execute(select(Week).order_by(Week.start_date))
+async def get_all_weeks(
+    session: AsyncSession,
+    after: tuple | None = None,
+    limit: int | None = None
+) -> Sequence[Week]:
+    result = await session.execute(keyset(select(Week), [Week.start_date, Week.id], after, limit))
     return result.scalars().all()
 
 async def get_week_by_id(session: AsyncSession, week_id: int) -> Week | None:
@@ -31,19 +38,25 @@ async def create_week_in_db(session: AsyncSession, week_data: WeekCreate) -> tup
     week = Week(**week_data.model_dump())
     session.add(week)
     await session.commit()
+    await entities_created(session)
     await session.refresh(week)
     return week, True
 
 async def update_week_in_db(session: AsyncSession, week: Week, update_data: WeekUpdate) -> Week:
+    previous_period = (week.start_date, week.end_date)
     for field, value in update_data.model_dump().items():
         setattr(week, field, value)
     await session.commit()
     await session.refresh(week)
+    await week_changed(session, previous_period, (week.start_date, week.end_date))
     return week
 
 async def delete_week_in_db(session: AsyncSession, week: Week) -> None:
+    period = (week.start_date, week.end_date)
+    await retract_metrics(session, LeadMetric.week_id == week.id)
     await session.delete(week)
     await session.commit()
+    await week_changed(session, period)
 
 
 
@@ -0,0 +1,111 @@
+"""Throughput of POST /lead_metrics/bulk's service: inserts, updates and a mix.
+
+    python -m benchmarks.bench_bulk_upsert --categories 50 --sources 40 --weeks 50 --batch 5000
+
+The seeded schema holds categories x sources x weeks metrics (100k with the
+defaults) and as many weeks again without metrics. Every workload sends
+`--rows` rows in requests of `--batch` rows, one session and transaction per
+request like the endpoint, including request body validation, the rollup
+deltas and the post-commit invalidation:
+
+- "insert": only new keys, in the empty weeks
+- "update": only existing keys
+- "mixed": half of each
+
+Results are in README.md.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import text
+
+from app.schemas.lead_metric import LeadMetricCreate
+from app.services.lead_metric_service import bulk_upsert_lead_metrics
+from app.services.rollup_service import rebuild_rollups
+from benchmarks.dataset import bench_database
+
+
+request_adapter = TypeAdapter(List[LeadMetricCreate])
+
+
+def payloads(keys: list[tuple[int, int, int]], rng: random.Random) -> list[dict]:
+    return [
+        {
+            "category_id": category_id,
+            "source_id": source_id,
+            "week_id": week_id,
+            "amount": rng.randint(5000, 100000),
+            "leads_count": rng.randint(1, 100)
+        }
+        for category_id, source_id, week_id in keys
+    ]
+
+
+async def measure(sessionmaker, rows: list[dict], batch: int) -> tuple[float, dict]:
+    counts = {"created": 0, "updated": 0, "failed": 0}
+    started = time.perf_counter()
+    for start in range(0, len(rows), batch):
+        async with sessionmaker() as session:
+            result = await bulk_upsert_lead_metrics(session, request_adapter.validate_python(rows[start:start + batch]))
+        counts["created"] += result.created
+        counts["updated"] += result.updated
+        counts["failed"] += result.failed
+    return time.perf_counter() - started, counts
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--sources", type=int, default=40)
+    parser.add_argument("--weeks", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=50000, help="rows per workload")
+    parser.add_argument("--batch", type=int, default=5000, help="rows per request")
+    parser.add_argument("--url", default=None, help="database url, defaults to the app settings")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    async with bench_database(args.categories, args.sources, args.weeks, args.url) as sessionmaker:
+        async with sessionmaker() as session:
+            await session.execute(
+                text(
+                    "INSERT INTO weeks (start_date, end_date) "
+                    "SELECT max_end + 1 + g * 7, max_end + 7 + g * 7 "
+                    "FROM (SELECT max(end_date) AS max_end FROM weeks) w, generate_series(0, :n - 1) g"
+                ),
+                {"n": args.weeks}
+            )
+            await rebuild_rollups(session)
+            await session.commit()
+
+        pairs = [(c, s) for c in range(1, args.categories + 1) for s in range(1, args.sources + 1)]
+        existing = [(c, s, w) for w in range(1, args.weeks + 1) for c, s in pairs]
+        empty = [(c, s, w) for w in range(args.weeks + 1, 2 * args.weeks + 1) for c, s in pairs]
+        rng.shuffle(existing)
+        half = args.rows // 2
+        if min(len(existing), len(empty)) < args.rows + half + 1:
+            raise SystemExit("--rows exceeds the seeded keys; raise --weeks")
+
+        workloads = {
+            "insert": empty[:args.rows],
+            "update": existing[:args.rows],
+            # New keys not used by "insert", existing ones not used by "update"
+            "mixed": empty[args.rows:args.rows + half] + existing[-(args.rows - half):],
+        }
+
+        print(f"{'workload':<10} {'rows':>8} {'created':>8} {'updated':>8} {'seconds':>8} {'rows/s':>9}")
+        for name, keys in workloads.items():
+            keys = list(keys)
+            rng.shuffle(keys)
+            seconds, counts = await measure(sessionmaker, payloads(keys, rng), args.batch)
+            print(
+                f"{name:<10} {len(keys):>8} {counts['created']:>8} {counts['updated']:>8} "
+                f"{seconds:>8.2f} {len(keys) / seconds:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""Latency of dashboard reads from the in-memory cube vs the SQL paths.
+
+    python -m benchmarks.bench_cube --categories 50 --sources 40 --weeks 500
+
+Each workload runs against raw lead_metrics ("live"), the rollup tables
+("rollup") and the cube, both through dashboard_service, which includes the
+data version check, and as the bare NumPy reduction ("cube compute").
+Needs numpy.
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from app.core.config import settings
+from app.services.aggregation import AggregationQuery
+from app.services.cube import LeadCube, publish_cube
+from app.services.dashboard_service import _aggregate, _summary_overview
+from app.services.rollup_service import rebuild_rollups
+from benchmarks.dataset import bench_database
+
+
+WORKLOADS = {
+    "category": AggregationQuery(dimensions=("category",), category_ids=(1,)),
+    "source": AggregationQuery(dimensions=("source",), source_ids=(1,)),
+    "all categories": AggregationQuery(dimensions=("category",)),
+    "slice": AggregationQuery(
+        dimensions=("category", "source"),
+        grain="total",
+        category_ids=tuple(range(1, 11)),
+        source_ids=tuple(range(1, 6)),
+        from_date=date(2018, 1, 1),
+        to_date=date(2020, 12, 31)
+    ),
+}
+
+
+async def measure(sessionmaker, read, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        async with sessionmaker() as session:
+            started = time.perf_counter()
+            await read(session)
+            timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def reads(query: AggregationQuery | None):
+    if query is None:
+        return _summary_overview
+    return lambda session: _aggregate(session, query)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--sources", type=int, default=40)
+    parser.add_argument("--weeks", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--url", default=None, help="database url, defaults to the app settings")
+    args = parser.parse_args()
+
+    async with bench_database(args.categories, args.sources, args.weeks, args.url) as sessionmaker:
+        async with sessionmaker() as session:
+            await rebuild_rollups(session)
+            await session.commit()
+
+        async with sessionmaker() as session:
+            started = time.perf_counter()
+            cube = await LeadCube.load(session)
+            loaded = time.perf_counter() - started
+        if cube is None:
+            raise SystemExit("The dataset exceeds DASHBOARD_CUBE_MAX_CELLS")
+        publish_cube(cube)
+        size = sum(array.nbytes for array in (cube.amount, cube.leads, cube.spend, cube.present))
+        print(f"cube: {cube.cells} cells, {size / 2 ** 20:.1f} MiB, loaded in {loaded:.2f} s\n")
+
+        print(f"{'workload':<16} {'live ms':>10} {'rollup ms':>10} {'cube ms':>10} {'compute ms':>11}")
+        for name, query in {"overview": None, **WORKLOADS}.items():
+            timings = []
+            for source, cube_enabled in (("live", False), ("rollup", False), ("rollup", True)):
+                settings.DASHBOARD_AGGREGATE_SOURCE = source
+                settings.DASHBOARD_CUBE_ENABLED = cube_enabled
+                timings.append(await measure(sessionmaker, reads(query), args.repeat))
+
+            compute = cube.overview if query is None else (lambda query=query: cube.aggregate(query))
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                compute()
+            timings.append((time.perf_counter() - started) / args.repeat)
+            print(f"{name:<16} " + " ".join(f"{seconds * 1000:>10.2f}" for seconds in timings[:3]) + f" {timings[3] * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
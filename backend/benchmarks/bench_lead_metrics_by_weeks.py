@@ -0,0 +1,134 @@
+"""Latency and Python heap peak of /dashboard/lead_metrics_by_weeks, old vs new.
+
+    python -m benchmarks.bench_lead_metrics_by_weeks --categories 50 --sources 40 --weeks 500
+
+The defaults produce 1M lead_metrics rows in a temporary schema of the
+configured PostgreSQL database. Each run produces the response body the way
+the endpoint does: legacy validates the whole list against the response model
+and renders it, current streams it week by week. Max RSS is for the whole process, so pass a
+single --implementation per run to compare it. Results are in README.md.
+"""
+import argparse
+import asyncio
+import resource
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.core.responses import dumps, streamed_envelope
+from app.db.models import LeadMetric
+from app.schemas.lead_metrics_by_week import LeadMetricGroupedByWeekSchema
+from app.services.dashboard_service import get_lead_metrics_by_weeks
+from benchmarks.dataset import bench_database
+
+
+response_adapter = TypeAdapter(List[LeadMetricGroupedByWeekSchema])
+
+
+async def legacy_lead_metrics_by_weeks(session):
+    """The ORM + joinedload implementation this endpoint used to have."""
+    stmt = select(LeadMetric).options(
+        joinedload(LeadMetric.week),
+        joinedload(LeadMetric.category),
+        joinedload(LeadMetric.source)
+    )
+    result = await session.execute(stmt)
+    lead_metrics = result.scalars().all()
+
+    week_dict = defaultdict(list)
+    for metric in lead_metrics:
+        week_key = (metric.week.start_date, metric.week.end_date)
+        week_dict[week_key].append({
+            "lead_metric_id": metric.id,
+            "amount": metric.amount,
+            "leads_count": metric.leads_count,
+            "category": {"id": metric.category.id, "name": metric.category.name},
+            "source": {"id": metric.source.id, "name": metric.source.name},
+            "week": {
+                "id": metric.week.id,
+                "start_date": metric.week.start_date.isoformat(),
+                "end_date": metric.week.end_date.isoformat()
+            }
+        })
+
+    return [
+        {"start_date": start, "end_date": end, "metrics": metrics}
+        for (start, end), metrics in sorted(week_dict.items())
+    ]
+
+
+async def legacy_body(session) -> int:
+    data = await legacy_lead_metrics_by_weeks(session)
+    dumps({"status": "ok", "data": response_adapter.validate_python(data), "message": "", "errors": None, "meta": None})
+    return sum(len(group["metrics"]) for group in data)
+
+
+async def current_body(session) -> int:
+    groups, _ = await get_lead_metrics_by_weeks(session)
+    rows = 0
+
+    async def counted():
+        nonlocal rows
+        async for group in groups:
+            rows += len(group["metrics"])
+            yield group
+
+    async for _ in streamed_envelope(counted(), ""):
+        pass
+    return rows
+
+
+IMPLEMENTATIONS = {
+    "legacy": legacy_body,
+    "current": current_body,
+}
+
+
+async def run(sessionmaker, implementation) -> int:
+    async with sessionmaker() as session:
+        return await implementation(session)
+
+
+async def measure(sessionmaker, implementation, repeat: int) -> tuple[float, float, int]:
+    """Best of `repeat` untraced runs, then one run under tracemalloc for the heap peak."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await run(sessionmaker, implementation)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    await run(sessionmaker, implementation)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak / 2 ** 20, rows
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--sources", type=int, default=40)
+    parser.add_argument("--weeks", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--url", default=None, help="database url, defaults to the app settings")
+    parser.add_argument(
+        "--implementation", choices=sorted(IMPLEMENTATIONS), action="append",
+        help="run only this implementation, repeatable; defaults to all"
+    )
+    args = parser.parse_args()
+
+    async with bench_database(args.categories, args.sources, args.weeks, args.url) as sessionmaker:
+        print(f"{'implementation':<12} {'rows':>10} {'best s':>8} {'peak MiB':>10} {'max RSS MiB':>12}")
+        for name in args.implementation or IMPLEMENTATIONS:
+            seconds, peak, rows = await measure(sessionmaker, IMPLEMENTATIONS[name], args.repeat)
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+            print(f"{name:<12} {rows:>10} {seconds:>8.2f} {peak:>10.1f} {rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
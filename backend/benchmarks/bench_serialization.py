@@ -0,0 +1,127 @@
+"""Response serialization cost of the largest dashboard endpoints, validated vs trusted.
+
+    python -m benchmarks.bench_serialization --categories 50 --sources 40 --weeks 100
+
+"validated" is the FastAPI default path: ResponseModel is built, dumped and
+re-validated against response_model, then rendered with the stdlib json module.
+"trusted" is what the dashboard routes now do (trusted_response), rendered
+with orjson when it is installed. No database is needed: payloads are synthetic
+but shaped exactly like the service results.
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.core.responses import orjson, trusted_response
+from app.schemas.lead_metrics_by_week import LeadMetricGroupedByWeekSchema
+from app.schemas.lead_stats import LeadStatsBatch, LeadStatsSummary, WeeklyStats
+from app.schemas.response import ResponseModel
+
+
+def lead_metrics_by_weeks_payload(categories: int, sources: int, weeks: int) -> list[dict]:
+    groups = []
+    metric_id = 0
+    for week_id in range(1, weeks + 1):
+        start_date = date(2020, 1, 6) + timedelta(weeks=week_id)
+        end_date = start_date + timedelta(days=6)
+        week = {"id": week_id, "start_date": start_date.isoformat(), "end_date": end_date.isoformat()}
+        metrics = []
+        for category_id in range(1, categories + 1):
+            for source_id in range(1, sources + 1):
+                metric_id += 1
+                metrics.append({
+                    "lead_metric_id": metric_id,
+                    "amount": metric_id * 7 % 100000,
+                    "leads_count": metric_id % 100 + 1,
+                    "category": {"id": category_id, "name": f"Категория {category_id}"},
+                    "source": {"id": source_id, "name": f"Источник {source_id}"},
+                    "week": week
+                })
+        groups.append({"start_date": start_date, "end_date": end_date, "metrics": metrics})
+    return groups
+
+
+def stats_batch_payload(categories: int, sources: int, weeks: int) -> LeadStatsBatch:
+    def summary(entity_id: int, **ids) -> LeadStatsSummary:
+        weekly = [
+            WeeklyStats(
+                id=week_id, start_date="01.01.2024", end_date="07.01.2024",
+                amount=entity_id * week_id, leads_count=week_id, lead_cost=float(entity_id), **ids
+            )
+            for week_id in range(1, weeks + 1)
+        ]
+        return LeadStatsSummary(
+            total_leads=sum(ws.leads_count for ws in weekly),
+            total_amount=sum(ws.amount for ws in weekly),
+            lead_cost=float(entity_id),
+            weekly_stats=weekly
+        )
+
+    return LeadStatsBatch(
+        categories={i: summary(i, category_id=i) for i in range(1, categories + 1)},
+        sources={i: summary(i, source_id=i) for i in range(1, sources + 1)}
+    )
+
+
+def build_app(by_weeks: list[dict], batch: LeadStatsBatch) -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/validated/by_weeks", response_model=ResponseModel[List[LeadMetricGroupedByWeekSchema]])
+    async def validated_by_weeks():
+        return ResponseModel(status="ok", data=by_weeks, message="ok")
+
+    @app.get("/trusted/by_weeks", response_model=ResponseModel[List[LeadMetricGroupedByWeekSchema]])
+    async def trusted_by_weeks():
+        return trusted_response(by_weeks, "ok")
+
+    @app.get("/validated/stats", response_model=ResponseModel[LeadStatsBatch])
+    async def validated_stats():
+        return ResponseModel(status="ok", data=batch, message="ok")
+
+    @app.get("/trusted/stats", response_model=ResponseModel[LeadStatsBatch])
+    async def trusted_stats():
+        return trusted_response(batch, "ok")
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, repeat: int) -> tuple[float, int]:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(path)
+        timings.append(time.perf_counter() - started)
+        size = len(response.content)
+    return min(timings), size
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--sources", type=int, default=40)
+    parser.add_argument("--weeks", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = build_app(
+        lead_metrics_by_weeks_payload(args.categories, args.sources, args.weeks),
+        stats_batch_payload(args.categories, args.sources, args.weeks)
+    )
+    print(f"orjson: {'yes' if orjson else 'no'}")
+    print(f"{'endpoint':<10} {'path':<10} {'best ms':>9} {'MiB':>8}")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for endpoint in ("by_weeks", "stats"):
+            for path in ("validated", "trusted"):
+                seconds, size = await measure(client, f"/{path}/{endpoint}", args.repeat)
+                print(f"{endpoint:<10} {path:<10} {seconds * 1000:>9.1f} {size / 2 ** 20:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
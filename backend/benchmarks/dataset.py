@@ -0,0 +1,66 @@
+"""Synthetic lead metrics in a throwaway PostgreSQL schema for benchmarks."""
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import *  # noqa: F401,F403 - register every table on Base.metadata
+
+
+BENCH_SCHEMA = "bench_dashboard"
+
+
+@asynccontextmanager
+async def bench_database(categories: int, sources: int, weeks: int, url: str | None = None):
+    """Yield a sessionmaker bound to a freshly seeded schema, dropped afterwards.
+
+    Produces categories * sources * weeks lead_metrics rows.
+    """
+    url = url or settings.database_url
+
+    admin = create_async_engine(url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    await admin.dispose()
+
+    engine = create_async_engine(url, connect_args={"server_settings": {"search_path": BENCH_SCHEMA}})
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                text("INSERT INTO categories (name) SELECT 'Category ' || g FROM generate_series(1, :n) g"),
+                {"n": categories}
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO sources (name, pricing_type) "
+                    "SELECT 'Source ' || g, CASE WHEN g % 5 = 0 THEN 'FIXED_PER_LEAD' ELSE 'TOTAL_DIVIDED' END::lead_pricing_type "
+                    "FROM generate_series(1, :n) g"
+                ),
+                {"n": sources}
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO weeks (start_date, end_date) "
+                    "SELECT DATE '2015-01-05' + g * 7, DATE '2015-01-05' + g * 7 + 6 "
+                    "FROM generate_series(0, :n - 1) g"
+                ),
+                {"n": weeks}
+            )
+            await conn.execute(text(
+                "INSERT INTO lead_metrics (category_id, source_id, week_id, amount, leads_count) "
+                "SELECT c.id, s.id, w.id, 5000 + (random() * 95000)::int, 1 + (random() * 99)::int "
+                "FROM categories c CROSS JOIN sources s CROSS JOIN weeks w"
+            ))
+            await conn.execute(text("ANALYZE"))
+
+        yield async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    finally:
+        await engine.dispose()
+        admin = create_async_engine(url)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await admin.dispose()
@@ -1,8 +1,14 @@
 #!/bin/sh
+set -e
 
 if [ ! -f .env ]; then
   echo ".env not found, copying from .env.example"
   cp .env.example .env
 fi
 
+# Migrations add indexes and materialized views to the tables create_all makes
+python -m app.db.init_db --tables-only
+alembic upgrade head
+python -m app.db.init_db
+
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
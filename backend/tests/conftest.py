@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.cache import dashboard_cache
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import Category, Source, Week
+from app.schemas.enum.lead import LeadPricingType
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def sessionmaker(monkeypatch):
+    """An empty in-memory SQLite database with every table, reading live lead_metrics."""
+    monkeypatch.setattr(settings, "DASHBOARD_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "DASHBOARD_CUBE_ENABLED", False)
+    monkeypatch.setattr(settings, "DASHBOARD_AGGREGATE_SOURCE", "live")
+    dashboard_cache.clear()
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def seed_entities(session: AsyncSession, categories: int, sources: int, week_starts: list[date]) -> None:
+    """Categories and sources with alternating pricing types, and one week per start date, ids in list order."""
+    session.add_all(Category(name=f"Category {i}") for i in range(1, categories + 1))
+    session.add_all(
+        Source(
+            name=f"Source {i}",
+            pricing_type=LeadPricingType.FIXED_PER_LEAD if i % 2 else LeadPricingType.TOTAL_DIVIDED
+        )
+        for i in range(1, sources + 1)
+    )
+    for start_date in week_starts:
+        # One at a time, so ids follow the list rather than the dates
+        session.add(Week(start_date=start_date, end_date=start_date + timedelta(days=6)))
+        await session.flush()
@@ -0,0 +1,61 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.db.models import LeadMetric
+from app.services.aggregation import AggregationQuery, aggregate
+from tests.conftest import seed_entities
+
+pytest.importorskip("numpy")
+
+from app.services.cube import LeadCube  # noqa: E402 - needs numpy
+
+
+pytestmark = pytest.mark.anyio
+
+FIRST_WEEK = date(2024, 1, 1)
+# Week ids follow this list, so ids 4-6 are dated before ids 1-3
+WEEK_STARTS = [FIRST_WEEK + timedelta(weeks=offset) for offset in (3, 4, 5, 0, 1, 2, 6)]
+
+
+@pytest.fixture
+async def seeded(sessionmaker):
+    rng = random.Random(7)
+    async with sessionmaker() as session:
+        await seed_entities(session, categories=3, sources=4, week_starts=WEEK_STARTS)
+        session.add_all(
+            LeadMetric(
+                category_id=category_id,
+                source_id=source_id,
+                week_id=week_id,
+                amount=rng.randint(0, 1000),
+                leads_count=rng.choice([0, 1, 5, 9])
+            )
+            for category_id in range(1, 4)
+            for source_id in range(1, 5)
+            for week_id in range(1, len(WEEK_STARTS) + 1)
+            if rng.random() < 0.7
+        )
+        await session.commit()
+    return sessionmaker
+
+
+@pytest.mark.parametrize("dimensions", [(), ("category",), ("source",), ("category", "source"), ("source", "category")])
+@pytest.mark.parametrize("grain", ["week", "total"])
+@pytest.mark.parametrize("filters", [
+    {},
+    {"category_ids": (1, 3)},
+    {"source_ids": (2,), "from_date": FIRST_WEEK + timedelta(weeks=1)},
+    {"from_date": FIRST_WEEK + timedelta(weeks=2), "to_date": FIRST_WEEK + timedelta(weeks=5, days=6)},
+])
+async def test_cube_matches_sql_when_week_ids_are_not_in_date_order(seeded, dimensions, grain, filters):
+    query = AggregationQuery(dimensions=dimensions, grain=grain, **filters)
+    async with seeded() as session:
+        cube = await LeadCube.load(session)
+        expected = await aggregate(session, query)
+
+    assert cube.aggregate(query) == expected
+    if grain == "week":
+        starts = [row["period_start"] for row in expected]
+        assert starts == sorted(starts)
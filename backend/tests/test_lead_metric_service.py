@@ -0,0 +1,99 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.db.models import LeadMetric
+from app.schemas.enum.lead import BulkRowStatus
+from app.schemas.lead_metric import LeadMetricCreate, LeadMetricUpdate
+from app.services.lead_metric_service import (
+    bulk_upsert_lead_metrics, create_lead_metric_in_db, update_lead_metric_in_db
+)
+from app.services.rollup_service import check_rollups, rebuild_rollups
+from tests.conftest import seed_entities
+
+
+pytestmark = pytest.mark.anyio
+
+
+def metric(category_id: int, source_id: int, week_id: int, amount: int, leads_count: int) -> LeadMetricCreate:
+    return LeadMetricCreate(
+        category_id=category_id, source_id=source_id, week_id=week_id, amount=amount, leads_count=leads_count
+    )
+
+
+async def test_bulk_upsert_reports_created_updated_and_failed_rows(sessionmaker):
+    async with sessionmaker() as session:
+        await seed_entities(session, categories=2, sources=2, week_starts=[date(2024, 1, 1)])
+        session.add(LeadMetric(category_id=1, source_id=1, week_id=1, amount=100, leads_count=10))
+        await session.flush()
+        await rebuild_rollups(session)
+        await session.commit()
+        existing_id = await session.scalar(select(LeadMetric.id))
+
+        result = await bulk_upsert_lead_metrics(session, [
+            metric(1, 1, 1, 150, 15),   # existing key
+            metric(2, 1, 1, 200, 20),   # new key
+            metric(9, 1, 1, 300, 30),   # unknown category
+            metric(1, 2, 9, 300, 30),   # unknown week
+            metric(2, 2, 1, 400, 40),   # superseded by the last row
+            metric(2, 2, 1, 500, 50),   # new key
+        ])
+
+    assert (result.created, result.updated, result.failed) == (2, 1, 3)
+    statuses = [(item.index, item.status) for item in result.items]
+    assert statuses == [
+        (0, BulkRowStatus.UPDATED),
+        (1, BulkRowStatus.CREATED),
+        (2, BulkRowStatus.FAILED),
+        (3, BulkRowStatus.FAILED),
+        (4, BulkRowStatus.FAILED),
+        (5, BulkRowStatus.CREATED),
+    ]
+    assert result.items[0].id == existing_id
+    assert result.items[2].error == "Unknown category_id"
+    assert result.items[3].error == "Unknown week_id"
+    assert all(item.id is None for item in result.items if item.status == BulkRowStatus.FAILED)
+
+    async with sessionmaker() as session:
+        stored = (await session.execute(
+            select(LeadMetric.id, LeadMetric.category_id, LeadMetric.source_id, LeadMetric.amount, LeadMetric.leads_count)
+            .order_by(LeadMetric.category_id, LeadMetric.source_id)
+        )).all()
+        assert stored == [
+            (existing_id, 1, 1, 150, 15),
+            (result.items[1].id, 2, 1, 200, 20),
+            (result.items[5].id, 2, 2, 500, 50),
+        ]
+        assert all(not mismatches for mismatches in (await check_rollups(session)).values())
+
+
+@pytest.mark.parametrize("key, detail", [
+    ((9, 1, 1), "Категория не найдена"),
+    ((1, 9, 1), "Источник не найден"),
+    ((1, 1, 9), "Неделя не найдена"),
+])
+async def test_create_and_update_reject_unknown_references(sessionmaker, key, detail):
+    category_id, source_id, week_id = key
+    async with sessionmaker() as session:
+        await seed_entities(session, categories=1, sources=2, week_starts=[date(2024, 1, 1)])
+        await session.commit()
+        stored, _ = await create_lead_metric_in_db(session, metric(1, 2, 1, 100, 10))
+
+        with pytest.raises(HTTPException) as created:
+            await create_lead_metric_in_db(session, metric(category_id, source_id, week_id, 100, 10))
+        assert (created.value.status_code, created.value.detail) == (404, detail)
+        await session.rollback()
+        await session.refresh(stored)
+
+        with pytest.raises(HTTPException) as updated:
+            await update_lead_metric_in_db(session, stored, LeadMetricUpdate(
+                category_id=category_id, source_id=source_id, week_id=week_id, amount=100, leads_count=10
+            ))
+        assert (updated.value.status_code, updated.value.detail) == (404, detail)
+
+    async with sessionmaker() as session:
+        assert (await session.execute(select(LeadMetric.category_id, LeadMetric.source_id, LeadMetric.week_id))).all() == [
+            (1, 2, 1)
+        ]
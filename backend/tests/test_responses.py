@@ -0,0 +1,22 @@
+from datetime import date
+
+import pytest
+
+from app.core.responses import streamed_envelope, trusted_response
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def items(*values):
+    for value in values:
+        yield value
+
+
+@pytest.mark.parametrize("data", [[], [{"start_date": date(2024, 1, 1), "metrics": [{"id": 1}]}, {"id": 2}]])
+async def test_streamed_envelope_renders_the_trusted_response_document(data):
+    meta = {"limit": 2, "next_cursor": None}
+
+    body = b"".join([chunk async for chunk in streamed_envelope(items(*data), "Fetched", meta)])
+
+    assert body == trusted_response(data, "Fetched", meta).body
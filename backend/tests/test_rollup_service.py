@@ -0,0 +1,41 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models import Category, CategoryRollup, LeadMetric, SourceRollup, WeekSourceRollup
+from app.schemas.lead_metric import LeadMetricCreate
+from app.services.category_service import delete_category_in_db
+from app.services.lead_metric_service import create_lead_metric_in_db, delete_lead_metric_in_db
+from app.services.rollup_service import check_rollups
+from tests.conftest import seed_entities
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def assert_consistent(session):
+    assert all(not mismatches for mismatches in (await check_rollups(session)).values())
+
+
+async def test_rollup_rows_left_without_metrics_are_deleted(sessionmaker):
+    async with sessionmaker() as session:
+        await seed_entities(session, categories=2, sources=2, week_starts=[date(2024, 1, 1), date(2024, 1, 8)])
+        await session.commit()
+        for category_id, source_id, week_id in ((1, 1, 1), (1, 2, 1), (2, 2, 2)):
+            await create_lead_metric_in_db(session, LeadMetricCreate(
+                category_id=category_id, source_id=source_id, week_id=week_id, amount=100, leads_count=4
+            ))
+
+        metric = await session.scalar(select(LeadMetric).where(LeadMetric.source_id == 1))
+        await delete_lead_metric_in_db(session, metric)
+
+        assert (await session.execute(select(WeekSourceRollup.week_id, WeekSourceRollup.source_id))).all() == [(1, 2), (2, 2)]
+        assert (await session.execute(select(SourceRollup.source_id))).scalars().all() == [2]
+        await assert_consistent(session)
+
+        await delete_category_in_db(session, await session.get(Category, 2))
+
+        assert (await session.execute(select(CategoryRollup.category_id))).scalars().all() == [1]
+        assert (await session.execute(select(WeekSourceRollup.week_id, WeekSourceRollup.source_id))).all() == [(1, 2)]
+        await assert_consistent(session)